@@ -0,0 +1,6 @@
+"""Process-wide support code for the सत्यासत्यम् Streamlit app.
+
+Streamlit re-executes `satyaasatyam.py` from the top on every rerun, so anything
+that must be shared between sessions (locks, caches, background workers) lives in
+this package, which Python imports only once per process.
+"""
@@ -0,0 +1,197 @@
+"""Compressed, append-only archive of finished rooms.
+
+The reaper moves rooms that finished (`results` or `ended_by_host`) and then
+sat idle for `reaper.ARCHIVE_AFTER_SECONDS` out of live storage into this archive. Live
+storage then only holds rooms still being played.
+
+Each archived room is one JSON line holding its final state and its event
+journal (in the compact form of `satya.codec`) and its chat. The line is compressed as its own gzip
+member and appended to the current segment, `segment-NNNNNN.jsonl.gz` under
+ARCHIVE_DIR. Segments roll over at SEGMENT_MAX_BYTES. A segment is an ordinary
+gzip file, so `zcat` turns it back into JSON lines.
+
+`index.bin` maps room IDs to `(segment, offset, length)` in fixed-size records
+sorted by ID. It is memory-mapped and binary-searched, so `load` costs a few
+page reads plus one seek and read in one segment. Each batch of archived rooms
+rewrites the index and atomically replaces it. An ID archived again (e.g. after
+a crash between archiving and deleting the live room) keeps its newest entry.
+Processes sharing the archive take turns appending through an flock on
+`.lock` (where `fcntl` exists).
+"""
+import gzip
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+from satya import codec
+from satya.cache import freeze
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single archiving process is assumed
+    fcntl = None
+
+ARCHIVE_DIR = os.environ.get("SATYA_ARCHIVE_DIR", "gamerooms-archive")
+INDEX_FILE = "index.bin"
+LOCK_FILE = ".lock"
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+FINISHED_PHASES = ("results", "ended_by_host")
+
+_ENTRY = struct.Struct("<16sIIQ")  # room ID, segment number, record length, offset
+
+
+def _segment_name(number):
+    return f"segment-{number:06d}.jsonl.gz"
+
+
+def _key(game_id):
+    """The index key of a room ID, or None for IDs that cannot be archived (non-ASCII or over 16 bytes)."""
+    try:
+        key = game_id.encode('ascii')
+    except (AttributeError, UnicodeEncodeError):
+        return None
+    return key.ljust(16, b"\0") if len(key) <= 16 else None
+
+
+class Archive:
+    """The archive under `root`; safe to share between threads of one process."""
+
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = root
+        self.lock = threading.Lock()
+        self._map = None
+        self._map_signature = None
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def _current_segment(self):
+        numbers = [int(name[8:14]) for name in os.listdir(self.root)
+                   if name.startswith("segment-") and name.endswith(".jsonl.gz")]
+        number = max(numbers, default=1)
+        path = self._path(_segment_name(number))
+        if os.path.exists(path) and os.path.getsize(path) >= SEGMENT_MAX_BYTES: number += 1
+        return number
+
+    def _index(self):
+        """The memory-mapped index, remapped when another writer replaced it; None when empty."""
+        try:
+            st = os.stat(self._path(INDEX_FILE))
+        except FileNotFoundError:
+            return None
+        signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if signature != self._map_signature:
+            if self._map is not None: self._map.close()
+            self._map = None
+            if st.st_size:
+                with open(self._path(INDEX_FILE), 'rb') as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._map_signature = signature
+        return self._map
+
+    def _find(self, key):
+        index = self._index()
+        if index is None: return None
+        lo, hi = 0, len(index) // _ENTRY.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if index[mid * _ENTRY.size:mid * _ENTRY.size + 16] < key: lo = mid + 1
+            else: hi = mid
+        if lo * _ENTRY.size >= len(index): return None
+        entry = _ENTRY.unpack_from(index, lo * _ENTRY.size)
+        return entry[1:] if entry[0] == key else None
+
+    def __contains__(self, game_id):
+        key = _key(game_id)
+        if key is None: return False
+        with self.lock:
+            return self._find(key) is not None
+
+    def load(self, game_id):
+        """`{"id", "archived_at", "state", "events", "chat"}` for an archived room, or None."""
+        key = _key(game_id)
+        if key is None: return None
+        with self.lock:
+            found = self._find(key)
+        if found is None: return None
+        segment, length, offset = found
+        with open(self._path(_segment_name(segment)), 'rb') as f:
+            f.seek(offset)
+            doc = json.loads(gzip.decompress(f.read(length)))
+        doc['state'] = codec.decode_state(doc['state'])
+        doc['events'] = [codec.decode_event(e) for e in doc.get('events', [])]
+        return doc
+
+    def add(self, rooms, now=None):
+        """Appends `[(state, events, chat_messages)]` durably and indexes them; returns the archived IDs.
+
+        Rooms whose ID cannot be keyed are skipped and stay in live storage.
+        """
+        rooms = [room for room in rooms if _key(room[0]['id']) is not None]
+        if not rooms: return []
+        now = time.time() if now is None else now
+        os.makedirs(self.root, exist_ok=True)
+        with self.lock, open(self._path(LOCK_FILE), 'a') as lock_file:
+            if fcntl: fcntl.flock(lock_file, fcntl.LOCK_EX)
+            segment = self._current_segment()
+            entries = {}
+            with open(self._path(_segment_name(segment)), 'ab') as f:
+                for state, events, messages in rooms:
+                    doc = {"id": state['id'], "archived_at": now, "state": codec.encode_state(state),
+                           "events": [codec.encode_event(e) for e in events], "chat": list(messages)}
+                    data = gzip.compress((codec.dumps(doc) + "\n").encode('utf-8'), mtime=0)
+                    entries[_key(state['id'])] = (segment, len(data), f.tell())
+                    f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self._write_index(entries)
+        return [room[0]['id'] for room in rooms]
+
+    def _write_index(self, new_entries):
+        index = self._index()
+        old = index[:] if index is not None else b""
+        merged = {}
+        for i in range(0, len(old), _ENTRY.size):
+            key, *location = _ENTRY.unpack_from(old, i)
+            merged[key] = location
+        merged.update(new_entries)
+        tmp_path = self._path(f"{INDEX_FILE}.tmp-{os.getpid()}")
+        with open(tmp_path, 'wb') as f:
+            f.write(b"".join(_ENTRY.pack(key, *merged[key]) for key in sorted(merged)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path(INDEX_FILE))
+
+    def __len__(self):
+        with self.lock:
+            index = self._index()
+            return len(index) // _ENTRY.size if index is not None else 0
+
+
+_archive = None
+_archive_guard = threading.Lock()
+
+
+def get_archive():
+    """The process's archive, created on first use."""
+    global _archive
+    with _archive_guard:
+        if _archive is None: _archive = Archive()
+        return _archive
+
+
+def load_archived_state(game_id):
+    """The final state of an archived room (read-only, like `store.load_game_state`), or None."""
+    if not game_id: return None
+    doc = get_archive().load(game_id)
+    return freeze(doc['state']) if doc else None
+
+
+def load_archived_journal(game_id):
+    """The event journal of an archived room, oldest first, or None."""
+    if not game_id: return None
+    doc = get_archive().load(game_id)
+    return doc['events'] if doc else None
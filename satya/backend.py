@@ -0,0 +1,161 @@
+"""The interface room storage backends implement.
+
+`satya.store` layers locking, versioning, caching and change notification on
+top of a backend, so a backend only has to persist room snapshots, the per-room
+event journal (see `satya.journal`) and per-room chat logs. Two are provided:
+`satya.filestore.JsonFileBackend` (files per room) and
+`satya.sqlitestore.SqliteBackend` (SQLite in WAL mode).
+"""
+import threading
+import time
+from collections import Counter, deque
+
+from satya import metrics
+from satya.cache import freeze
+
+CHAT_TAIL_SIZE = 100
+
+
+class VersionConflict(Exception):
+    """Raised when a compare-and-swap save finds that the room has moved on."""
+
+    def __init__(self, game_id, expected, actual):
+        super().__init__(f"room {game_id}: expected version {expected}, found {actual}")
+        self.game_id, self.expected, self.actual = game_id, expected, actual
+
+
+class RoomBackend:
+    """Persistence for room documents. Callers hold the room's lock around writes.
+
+    `io` counts storage operations (reads, snapshot writes, journal appends,
+    chat appends) and the bytes they wrote, for benchmarks and metrics.
+    """
+
+    def __init__(self):
+        self.io = Counter()
+        self._io_lock = threading.Lock()
+
+    def count_io(self, op, nbytes=0):
+        with self._io_lock:
+            self.io[op] += 1
+            if nbytes: self.io['bytes_written'] += nbytes
+        if nbytes:
+            metrics.observe("satya_storage_write_bytes", nbytes, metrics.BYTES_BUCKETS,
+                            help="Size of each storage write.", op=op)
+
+    def prepare(self):
+        """One-time setup when the process starts (schema, layout migration)."""
+
+    def signature(self, game_id):
+        """A cheap token that changes whenever the stored room changes; None if it does not exist."""
+        raise NotImplementedError
+
+    def read(self, game_id):
+        """Returns `(signature, snapshot, events)` for the stored room, or None.
+
+        `events` are the journal entries recorded after the snapshot's version.
+        """
+        raise NotImplementedError
+
+    def write(self, state, previous_version):
+        """Atomically replaces the room's snapshot with `state` and returns the new signature.
+
+        `previous_version` is the version the caller saw; backends that can be
+        written by other processes use it to raise `VersionConflict`.
+        """
+        raise NotImplementedError
+
+    def append_events(self, game_id, events, previous_version):
+        """Appends recorded events to the room's journal and returns the new signature."""
+        raise NotImplementedError
+
+    def read_events(self, game_id):
+        """The room's whole journal, oldest first."""
+        raise NotImplementedError
+
+    def delete(self, game_id):
+        raise NotImplementedError
+
+    def list_ids(self):
+        raise NotImplementedError
+
+    def last_activity(self, game_id):
+        """Unix time of the room's last state or chat write, or None."""
+        raise NotImplementedError
+
+    def housekeeping(self, now):
+        """Periodic clean-up run by the reaper."""
+
+    def open_chat(self, game_id):
+        """Returns the room's `ChatLog`."""
+        raise NotImplementedError
+
+    def delete_chat(self, game_id):
+        raise NotImplementedError
+
+    def claim(self, game_id, token, owner, now, ttl):
+        """Takes the lease named `token` on a room for `owner`; returns True if `owner` holds it.
+
+        A lease held by another owner can be taken over once it is `ttl`
+        seconds old. Leases are removed with the room.
+        """
+        raise NotImplementedError
+
+    def read_leaderboard(self):
+        """All-time leaderboard rows and counted rooms: `({user_id: {"name", "score", "games"}}, {room_id})`."""
+        raise NotImplementedError
+
+    def record_leaderboard(self, game_id, entries, now):
+        """Persists one finished room's `{user_id: (name, points)}` into the all-time leaderboard."""
+        raise NotImplementedError
+
+    def room_bytes(self, game_id):
+        """Stored bytes of the room by kind: `{"snapshot": n, "journal": n, "chat": n}`."""
+        raise NotImplementedError
+
+
+class ChatLog:
+    """An append-only, per-room message log with a bounded in-memory tail.
+
+    Subclasses load existing records in `__init__` (calling `_loaded` for each)
+    and implement `_persist` and `_read_stored`. Logs that other processes
+    append to as well override `refresh`, which readers call under `lock`.
+    """
+
+    def __init__(self, game_id):
+        self.game_id = game_id
+        self.lock = threading.Lock()
+        self.count = 0
+        self.tail = deque(maxlen=CHAT_TAIL_SIZE)
+        self.closed = False  # set under `lock` when the room's chat is deleted; appends then refuse
+
+    def _loaded(self, record):
+        self.count += 1
+        self.tail.append(freeze(record))
+
+    def _persist(self, record):
+        raise NotImplementedError
+
+    def _read_stored(self, start, stop):
+        raise NotImplementedError
+
+    def refresh(self):
+        """Picks up messages appended by other processes since the log was last read."""
+
+    def append(self, message):
+        """Stores the message and returns its seq, or None once the log is closed."""
+        with self.lock:
+            if self.closed: return None
+            record = dict(message, seq=self.count, ts=time.time())
+            self._persist(record)
+            self._loaded(record)
+            return record['seq']
+
+    def read(self, start, stop):
+        """Messages with start <= seq < stop, from the tail when possible."""
+        start, stop = max(0, start), min(stop, self.count)
+        if start >= stop: return []
+        tail_start = self.count - len(self.tail)
+        if start >= tail_start:
+            return [self.tail[i - tail_start] for i in range(start, stop)]
+        return [freeze(record) for record in self._read_stored(start, stop)]
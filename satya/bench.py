@@ -0,0 +1,276 @@
+"""Load generator and benchmark: plays simulated games against the real store.
+
+    python -m satya.bench [--rooms 50] [--viewers 20] [--chat 10] [--backend json|sqlite]
+                          [--workers 4] [--reruns-per-action 4] [--app-reruns 0] [--output FILE]
+
+Each room is a full game (four players join, write, guess, see the results)
+plus `--viewers` viewer guesses and `--chat` chat messages, driven through
+`satya.engine` and `satya.store` exactly as the page drives them. Every action
+is followed by `--reruns-per-action` simulated reruns of every player and
+viewer in the room: the reads a page rerun does (load the room, catch up on
+chat). Pages never advance rooms; once a phase's last move is in, the room is
+advanced with `satya.scheduler.advance_room` at the run's virtual clock, lease
+claim included, as the scheduler thread would. Rooms are played by
+`--workers` threads at once so lock and cache contention show up.
+
+The storage lives in a temporary directory and is thrown away afterwards. The
+JSON report has per-operation latency percentiles, games per second, backend
+reads/writes/bytes per game and the stored size of a finished room. With
+`--app-reruns N` it also times N real Streamlit reruns (via
+`streamlit.testing`) of the page for a player and a viewer in every phase,
+and 25 N executions of the page script's top level on their own.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import string
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from satya import chat, engine, scheduler, store
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "satyaasatyam.py")
+PERCENTILES = (50, 90, 99)
+
+
+class Timings:
+    """Latency samples per operation name, shared by the worker threads."""
+
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, op):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.samples.setdefault(op, []).append(elapsed)
+
+    def summary(self):
+        return {op: _percentiles(values) for op, values in sorted(self.samples.items())}
+
+
+def _percentiles(values):
+    values = sorted(values)
+    summary = {"count": len(values), "mean_ms": 1000 * sum(values) / len(values)}
+    for p in PERCENTILES:
+        summary[f"p{p}_ms"] = 1000 * values[min(len(values) - 1, len(values) * p // 100)]
+    summary["max_ms"] = 1000 * values[-1]
+    return summary
+
+
+def _new_game_id(rng):
+    return "".join(rng.choices(string.ascii_uppercase + string.digits, k=6))
+
+
+def _sentences(rng, n=3):
+    return [" ".join(rng.choice(["satyam", "vadati", "grhe", "vane", "nadyam", "pasyami"]) for _ in range(8))
+            for _ in range(n)]
+
+
+class RoomRun:
+    """One simulated room: its participants, their chat cursors and a virtual clock.
+
+    The clock is spread over each phase so that every move lands inside the
+    phase's time limit, however many viewers there are; a move that records
+    nothing fails the run rather than being timed as a no-op.
+    """
+
+    def __init__(self, game_id, rng, timings, viewers, reruns):
+        self.game_id, self.rng, self.timings = game_id, rng, timings
+        self.reruns = reruns
+        self.now = time.time()
+        self.players = [(f"{game_id}-u{i+1}", pid) for i, pid in enumerate(engine.PLAYER_SLOTS)]
+        self.viewers = [f"{game_id}-v{i+1}" for i in range(viewers)]
+        self.chat_seen = {uid: -1 for uid, _ in self.players}
+        self.chat_seen.update({uid: -1 for uid in self.viewers})
+
+    def tick(self, seconds=1.0):
+        self.now += seconds
+
+    def rerun_everyone(self):
+        """What every open page does after a change: read the room and catch up on chat."""
+        for _ in range(self.reruns):
+            for uid in self.chat_seen:
+                with self.timings.measure("rerun"):
+                    store.load_game_state(self.game_id)
+                    new = chat.messages_since(self.game_id, self.chat_seen[uid])
+                    if new: self.chat_seen[uid] = new[-1]['seq']
+
+    def record(self, op, step):
+        recorded = []
+
+        def counted(state):
+            state, events = step(state)
+            recorded.extend(events)
+            return state, events
+        with self.timings.measure(op):
+            state = store.record_events(self.game_id, counted)
+        assert recorded, f"{op} recorded nothing in room {self.game_id} ({state['phase']})"
+        if engine.transition_due(state, self.now): state = self.advance()
+        self.rerun_everyone()
+        return state
+
+    def advance(self):
+        """The scheduler's transition once the phase's last move is in."""
+        with self.timings.measure("advance"):
+            state = scheduler.advance_room(self.game_id, self.now)
+        assert not engine.transition_due(state, self.now), f"room {self.game_id} not advanced ({state['phase']})"
+        return state
+
+    def post_chat(self, uid):
+        with self.timings.measure("chat"):
+            chat.post_message(self.game_id, {"user_id": uid, "name": uid, "text": "namaste", "ts": self.now})
+        self.rerun_everyone()
+
+    def play(self, chat_messages):
+        with self.timings.measure("create"):
+            store.create_game_state(engine.get_initial_state(
+                self.game_id, {"require_names": True}, self.players[0][0], rng=self.rng))
+        self.rerun_everyone()
+        for i, (uid, pid) in enumerate(self.players):
+            self.tick()
+            self.record("join", lambda s: engine.join(s, uid, pid, f"P{i+1}", self.now))
+        talkers = [uid for uid, _ in self.players] + self.viewers
+        for _ in range(chat_messages):  # chat takes the first half of the writing phase, submissions the rest
+            self.tick(min(1.0, engine.WRITING_TIME_LIMIT / 2 / (chat_messages + 1)))
+            self.post_chat(self.rng.choice(talkers))
+        for uid, pid in self.players:
+            self.tick(engine.WRITING_TIME_LIMIT / 2 / (len(self.players) + 1))
+            self.record("submit", lambda s: engine.submit(s, pid, _sentences(self.rng), self.now))
+        guessers = self.viewers + [uid for uid, _ in self.players]
+        for uid in guessers:
+            self.tick(min(1.0, engine.GUESSING_TIME_LIMIT / (len(guessers) + 1)))
+            guesses = dict(zip(engine.PLAYER_SLOTS, self.rng.sample(engine.VARNA_KEYS, len(engine.VARNA_KEYS))))
+            self.record("guess", lambda s: engine.guess(s, uid, guesses, self.now))
+        state = store.load_game_state(self.game_id)
+        assert state['phase'] == 'results', state['phase']
+        return state
+
+
+def run_games(rooms, viewers, chat_messages, workers, reruns, seed=0):
+    """Plays `rooms` games on the current backend; returns `(timings, game_ids, elapsed_seconds)`."""
+    timings = Timings()
+    seed_rng = random.Random(seed)
+    runs = [RoomRun(_new_game_id(seed_rng), random.Random(seed_rng.random()), timings, viewers, reruns)
+            for _ in range(rooms)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in pool.map(lambda run: run.play(chat_messages), runs): pass
+    return timings, [run.game_id for run in runs], time.perf_counter() - start
+
+
+def time_page_exec(runs):
+    """Times executing the page script's top level, which Streamlit repeats on every rerun."""
+    timings = Timings()
+    with open(APP_PATH, encoding='utf-8') as f:
+        code = compile(f.read(), APP_PATH, "exec")
+    for _ in range(runs):
+        with timings.measure("page_exec"):
+            exec(code, {"__name__": "__satya_bench__", "__file__": APP_PATH})
+    return timings
+
+
+def time_app_reruns(reruns, viewers=2):
+    """Times real page reruns for a player and a viewer in every phase of one game."""
+    from streamlit.testing.v1 import AppTest
+
+    timings = Timings()
+    rng = random.Random(1)
+    run = RoomRun(_new_game_id(rng), rng, Timings(), viewers, 0)
+
+    def render(phase):
+        for label, uid, role in (("player", run.players[1][0], None), ("viewer", run.viewers[0], "viewer")):
+            at = AppTest.from_file(APP_PATH, default_timeout=60)
+            at.query_params["uid"] = uid
+            at.query_params["id"] = run.game_id
+            if role: at.query_params["role"] = role
+            at.run()
+            for _ in range(reruns):
+                with timings.measure(f"app_{phase}_{label}"):
+                    at.run()
+
+    store.create_game_state(engine.get_initial_state(run.game_id, {"require_names": True}, run.players[0][0], rng=rng))
+    render("joining")
+    for i, (uid, pid) in enumerate(run.players):
+        store.record_events(run.game_id, lambda s: engine.join(s, uid, pid, f"P{i+1}", time.time()))
+    scheduler.advance_room(run.game_id)
+    render("writing")
+    for uid, pid in run.players:
+        store.record_events(run.game_id, lambda s: engine.submit(s, pid, _sentences(rng), time.time()))
+    scheduler.advance_room(run.game_id)
+    render("guessing")
+    for uid in run.viewers + [uid for uid, _ in run.players]:
+        guesses = dict(zip(engine.PLAYER_SLOTS, rng.sample(engine.VARNA_KEYS, len(engine.VARNA_KEYS))))
+        store.record_events(run.game_id, lambda s: engine.guess(s, uid, guesses, time.time()))
+    scheduler.advance_room(run.game_id)
+    render("results")
+    store.delete_game_state(run.game_id)
+    return timings
+
+
+def benchmark(rooms=50, viewers=20, chat_messages=10, backend="json", workers=4, reruns=4, app_reruns=0):
+    """Runs the benchmark in a throw-away storage directory and returns the report dict."""
+    root = tempfile.mkdtemp(prefix="satya-bench-")
+    target = store.make_backend(backend, root)
+    target.prepare()
+    previous = store.use_backend(target)
+    game_ids = []
+    try:
+        timings, game_ids, elapsed = run_games(rooms, viewers, chat_messages, workers, reruns)
+        sizes = [target.room_bytes(game_id) for game_id in game_ids]
+        report = {
+            "config": {"rooms": rooms, "viewers": viewers, "chat": chat_messages, "backend": backend,
+                       "workers": workers, "reruns_per_action": reruns, "python": sys.version.split()[0]},
+            "elapsed_seconds": elapsed,
+            "games_per_second": rooms / elapsed,
+            "latency": timings.summary(),
+            "io_per_game": {op: n / rooms for op, n in sorted(target.io.items())},
+            "room_bytes": {kind: sum(s[kind] for s in sizes) / rooms for kind in sizes[0]} if sizes else {},
+            "cache": store.cache_stats(),
+        }
+        if app_reruns:
+            report["app_latency"] = {**time_app_reruns(app_reruns).summary(),
+                                     **time_page_exec(app_reruns * 25).summary()}
+        return report
+    finally:
+        for game_id in game_ids:
+            store.delete_game_state(game_id)
+            chat.delete_chat(game_id)
+        store.use_backend(previous)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--viewers", type=int, default=20)
+    parser.add_argument("--chat", type=int, default=10)
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--reruns-per-action", type=int, default=4)
+    parser.add_argument("--app-reruns", type=int, default=0, help="also time N real page reruns per phase")
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    args = parser.parse_args(argv)
+
+    report = benchmark(args.rooms, args.viewers, args.chat, args.backend, args.workers,
+                       args.reruns_per_action, args.app_reruns)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Bounded, thread-safe LRU caches and read-only views for sharing decoded state.
+
+Cached room states are handed to every session in the process, so they are
+frozen: dicts become `FrozenDict` and lists become tuples. Both still serialise
+with `json` and support every read the UI does; code that needs to change a room
+takes a private mutable copy with `thaw`, or copies only the parts it changes
+(see `journal.fold`) as `DraftDict`s. A `FrozenDict` only ever holds frozen
+values, so `freeze` returns one unchanged, and refreezing a draft only visits
+the keys that were set on it.
+"""
+import threading
+from collections import OrderedDict
+
+
+class FrozenDict(dict):
+    """A dict that refuses in-place mutation."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("cached room state is read-only; record an event to change it")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    setdefault = update = pop = popitem = clear = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+class DraftDict(dict):
+    """A mutable shallow copy of a `FrozenDict` that remembers which keys were set."""
+
+    def __init__(self, frozen):
+        super().__init__(frozen)
+        self.changed = set()
+
+    def __setitem__(self, key, value):
+        self.changed.add(key)
+        super().__setitem__(key, value)
+
+    def setdefault(self, key, default=None):
+        if key not in self: self[key] = default
+        return self[key]
+
+
+def freeze(obj):
+    if isinstance(obj, FrozenDict): return obj
+    if isinstance(obj, DraftDict):
+        frozen = FrozenDict(obj)
+        for key in obj.changed & obj.keys():
+            dict.__setitem__(frozen, key, freeze(obj[key]))
+        return frozen
+    if isinstance(obj, dict):
+        return FrozenDict((k, freeze(v)) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return tuple(freeze(v) for v in obj)
+    return obj
+
+
+def thaw(obj):
+    if isinstance(obj, dict):
+        return {k: thaw(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [thaw(v) for v in obj]
+    return obj
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Least-recently-used mapping with a fixed capacity and hit/miss counters."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None, is_fresh=None):
+        """Returns the cached value; entries rejected by `is_fresh` are dropped and count as misses."""
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is not _MISSING and is_fresh is not None and not is_fresh(value):
+                del self._data[key]
+                value = _MISSING
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "size": len(self._data), "maxsize": self.maxsize}
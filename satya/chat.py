@@ -0,0 +1,80 @@
+"""Per-room append-only chat log, kept outside the room state document.
+
+Posting a message appends one record carrying a sequence number (`seq`, starting
+at 0) to the room's log in the active backend (a `<id>.chat.jsonl` file, or rows
+in the SQLite `chat` table). Each open log keeps a bounded tail of recent
+messages, so posting is a single append, catching up costs only the messages a
+client has not seen, and older history is read a page at a time. Readers first
+pick up messages other processes appended to a shared log (`ChatLog.refresh`).
+
+A log is only used while its room is still in live storage. Once the reaper
+has deleted or archived a room, posting to it does nothing and reading it
+returns no messages, so a page still open on the room cannot recreate its log.
+"""
+import threading
+
+from satya import store
+
+CHAT_PAGE_SIZE = 30
+
+
+_logs = {}
+_logs_guard = threading.Lock()
+
+
+def _log(game_id):
+    """The room's open log, or None if the room is no longer in live storage (checked on every call,
+    since another process may have reaped it)."""
+    live = store.room_exists(game_id)
+    with _logs_guard:
+        log = _logs.get(game_id)
+        if not live:
+            _logs.pop(game_id, None)
+            return None
+        if log is None:
+            log = _logs[game_id] = store.get_backend().open_chat(game_id)
+        return log
+
+
+def post_message(game_id, message):
+    """Appends a message dict to the room's chat and returns its sequence number, or None if the room is gone."""
+    log = _log(game_id)
+    return log.append(message) if log is not None else None
+
+
+def messages_since(game_id, after_seq, limit=CHAT_PAGE_SIZE):
+    """Up to `limit` of the newest messages with seq > after_seq, oldest first."""
+    log = _log(game_id)
+    if log is None: return []
+    with log.lock:
+        log.refresh()
+        stop = log.count
+        return log.read(max(after_seq + 1, stop - limit), stop)
+
+
+def messages_before(game_id, before_seq, limit=CHAT_PAGE_SIZE):
+    """One page of older history: up to `limit` messages with seq < before_seq."""
+    log = _log(game_id)
+    if log is None: return []
+    with log.lock:
+        log.refresh()
+        return log.read(before_seq - limit, before_seq)
+
+
+def all_messages(game_id):
+    """Every message of the room, oldest first."""
+    log = _log(game_id)
+    if log is None: return []
+    with log.lock:
+        log.refresh()
+        return log.read(0, log.count)
+
+
+def delete_chat(game_id):
+    """Deletes the room's chat; call it after the room itself is deleted, so the log is not reopened."""
+    with _logs_guard:
+        log = _logs.pop(game_id, None)
+    if log is not None:
+        with log.lock:  # waits for an append in progress, then refuses later ones
+            log.closed = True
+    store.get_backend().delete_chat(game_id)
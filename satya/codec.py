@@ -0,0 +1,88 @@
+"""Compact stored form of room snapshots and events.
+
+Backends store documents as minified JSON (`dumps`). Player slots are stored as
+their number ("player_3" -> 3) and varnas as their index in
+`engine.VARNA_KEYS`. A set of guesses becomes one character per slot: a varna
+index, "-" for a skipped guess or "." for a slot not guessed. The true varna
+map becomes one varna index per slot. Decoding accepts both this form and the
+original one, so rooms stored before keep loading.
+"""
+import json
+
+from satya.engine import NUM_PLAYERS, PLAYER_SLOTS, VARNA_KEYS
+
+SKIPPED, ABSENT = "-", "."
+_VARNA_CODES = {varna: str(i) for i, varna in enumerate(VARNA_KEYS)}
+_SLOT_INDEX = {pid: i for i, pid in enumerate(PLAYER_SLOTS)}
+
+
+def dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+def encode_pid(pid):
+    return _SLOT_INDEX[pid] + 1
+
+
+def decode_pid(code):
+    code = str(code)
+    return code if code.startswith("player_") else f"player_{code}"
+
+
+def encode_guesses(guesses):
+    if not isinstance(guesses, dict): return guesses  # "TIMEOUT"
+    chars = [ABSENT] * NUM_PLAYERS
+    for pid, varna in guesses.items():
+        chars[_SLOT_INDEX[pid]] = SKIPPED if varna is None else _VARNA_CODES[varna]
+    return "".join(chars)
+
+
+def decode_guesses(value):
+    if not isinstance(value, str) or len(value) != NUM_PLAYERS or set(value) - set("0123" + SKIPPED + ABSENT):
+        return value  # the original dict form, or "TIMEOUT"
+    return {PLAYER_SLOTS[i]: None if c == SKIPPED else VARNA_KEYS[int(c)]
+            for i, c in enumerate(value) if c != ABSENT}
+
+
+def encode_state(state):
+    state = dict(state)
+    if 'players' in state:
+        state['players'] = {encode_pid(pid): p for pid, p in state['players'].items()}
+    if 'player_user_ids' in state:
+        state['player_user_ids'] = {uid: encode_pid(pid) for uid, pid in state['player_user_ids'].items()}
+    if 'true_varna_map' in state:
+        state['true_varna_map'] = "".join(_VARNA_CODES[state['true_varna_map'][pid]] for pid in PLAYER_SLOTS)
+    if 'guesses' in state:
+        state['guesses'] = {uid: encode_guesses(g) for uid, g in state['guesses'].items()}
+    return state
+
+
+def decode_state(state):
+    if 'players' in state:
+        state['players'] = {decode_pid(pid): p for pid, p in state['players'].items()}
+    if 'player_user_ids' in state:
+        state['player_user_ids'] = {uid: decode_pid(pid) for uid, pid in state['player_user_ids'].items()}
+    if isinstance(state.get('true_varna_map'), str):
+        state['true_varna_map'] = {pid: VARNA_KEYS[int(c)] for pid, c in zip(PLAYER_SLOTS, state['true_varna_map'])}
+    if 'guesses' in state:
+        state['guesses'] = {uid: decode_guesses(g) for uid, g in state['guesses'].items()}
+    return state
+
+
+def encode_event(e):
+    e = dict(e)
+    if 'state' in e: e['state'] = encode_state(e['state'])
+    if 'player_id' in e: e['player_id'] = encode_pid(e['player_id'])
+    if 'guesses' in e: e['guesses'] = encode_guesses(e['guesses'])
+    if e.get('phase') == 'guessing' and 'timed_out' in e:
+        e['timed_out'] = [encode_pid(pid) for pid in e['timed_out']]
+    return e
+
+
+def decode_event(e):
+    if 'state' in e: e['state'] = decode_state(e['state'])
+    if 'player_id' in e: e['player_id'] = decode_pid(e['player_id'])
+    if 'guesses' in e: e['guesses'] = decode_guesses(e['guesses'])
+    if e.get('phase') == 'guessing' and 'timed_out' in e:
+        e['timed_out'] = [decode_pid(pid) for pid in e['timed_out']]
+    return e
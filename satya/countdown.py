@@ -0,0 +1,38 @@
+"""Phase countdown that ticks in the browser.
+
+`countdown_html` returns a self-contained HTML snippet, shown with
+`st.iframe`, that counts down from the seconds left when the
+page was rendered. It ticks on the client with no server reruns. It uses the
+same formats as the page used to render on the server: "m:ss", or "॥m।ss॥" in
+Devanagari numerals for Sanskrit. The seconds left, not the deadline, are sent
+so a skewed client clock does not shift the timer.
+"""
+import html
+import json
+
+from satya.i18n import to_devanagari
+
+COUNTDOWN_HEIGHT = 58
+
+_TEMPLATE = """<div id="c" style="font-family: 'Source Sans Pro', sans-serif; font-weight: 600; font-size: 1rem;
+  color: rgb(146, 108, 5); background: rgba(255, 189, 69, 0.2); border-radius: 0.5rem; padding: 0.75rem 1rem;">
+  {label} <span id="t"></span></div>
+<script>
+const end = Date.now() + {remaining_ms}, digits = {digits}, sa = {sa};
+const num = s => digits ? String(s).replace(/[0-9]/g, d => digits[d]) : String(s);
+function tick() {{
+  const left = Math.max(0, Math.ceil((end - Date.now()) / 1000));
+  const m = Math.floor(left / 60), s = String(left % 60).padStart(2, "0");
+  document.getElementById("t").textContent = sa ? `॥${{num(m)}}।${{num(s)}}॥` : `${{m}}:${{s}}`;
+  if (left > 0) setTimeout(tick, 1000 - ((end - Date.now()) % 1000 + 1000) % 1000 || 1000);
+}}
+tick();
+</script>"""
+
+
+def countdown_html(remaining_seconds, lang, label):
+    """HTML for a countdown of `remaining_seconds`, labelled with `label`."""
+    sa = lang == "sa"
+    return _TEMPLATE.format(label=html.escape(label), remaining_ms=int(max(0, remaining_seconds) * 1000),
+                            digits=json.dumps(to_devanagari("0123456789") if sa else None, ensure_ascii=False),
+                            sa=json.dumps(sa))
@@ -0,0 +1,191 @@
+"""Headless game engine: the rules of सत्यासत्यम् with no Streamlit in sight.
+
+Every action takes the current room state plus explicit inputs (`now`, an RNG,
+localised labels) and returns `(new_state, events)`. The events are stamped with
+their `seq` and `at` and are exactly what the store appends to the room's
+journal; `new_state` is the fold of those events. An action that is not valid
+for the room any more returns the state unchanged and no events, so the same
+call is safe to repeat. The input state is never modified, so frozen cached
+states can be passed straight in; the new state is frozen too and shares every
+part of the old one that the events did not change.
+
+Because nothing here reads the clock, the session or global randomness, a load
+generator or worker can drive thousands of rooms directly, and a game is
+reproducible from its seed and inputs.
+"""
+import random
+
+from satya import journal
+from satya.cache import freeze
+
+VARNA_KEYS = ["Brahmin", "Kshatriya", "Vaishya", "Shudra"]
+NUM_PLAYERS = 4
+PLAYER_SLOTS = [f"player_{i+1}" for i in range(NUM_PLAYERS)]
+WRITING_TIME_LIMIT = 360  # 6 minutes
+GUESSING_TIME_LIMIT = 120 # 2 minutes
+CORRECT_GUESS_POINTS = 4
+WRONG_GUESS_POINTS = -1
+MAX_POINTS = CORRECT_GUESS_POINTS * (NUM_PLAYERS - 1)
+
+
+def default_viewer_name(uid):
+    return f"Viewer {uid[:4]}"
+
+
+def get_initial_state(game_id, settings, host_user_id, rng=random):
+    shuffled_varnas = rng.sample(VARNA_KEYS, len(VARNA_KEYS))
+    return {
+        "id": game_id, "phase": "joining", "settings": settings,
+        "players": {}, "player_user_ids": {}, "host_user_id": host_user_id,
+        "true_varna_map": {f"player_{i+1}": varna for i, varna in enumerate(shuffled_varnas)},
+        "guesses": {}, "guess_points": {}, "scores": {}, "last_round_scores": {}, "disqualified": []
+    }
+
+
+def apply(state, events, now):
+    """Stamps `events` with their seq/at and folds them into a copy of `state`, returned frozen."""
+    if not events: return state, []
+    version = state.get('version', 0)
+    events = [dict(e, seq=version + i + 1, at=e.get('at', now)) for i, e in enumerate(events)]
+    return freeze(journal.fold(freeze(state), events)), events
+
+
+def available_slots(state):
+    return [pid for pid in PLAYER_SLOTS if pid not in state['players']]
+
+
+def join(state, user_id, player_id, name, now):
+    if (state['phase'] != 'joining' or player_id not in available_slots(state)
+            or user_id in state['player_user_ids']
+            or name in [p['name'] for p in state['players'].values()]):
+        return state, []
+    return apply(state, [journal.event(journal.JOINED, player_id=player_id, name=name, user_id=user_id)], now)
+
+
+def submit(state, player_id, sentences, now):
+    if state['phase'] != 'writing' or player_id not in state['players'] or state['players'][player_id].get('submitted'):
+        return state, []
+    return apply(state, [journal.event(journal.SUBMITTED, player_id=player_id, sentences=list(sentences))], now)
+
+
+def guess(state, user_id, guesses, now):
+    """Records a player's or viewer's guesses (player id -> varna key, or None to skip).
+
+    The guess is scored on arrival and its points travel in the event, so
+    closing the round only has to add up the guessers who scored.
+    """
+    if state['phase'] != 'guessing' or user_id in state.get('guesses', {}):
+        return state, []
+    points = guess_points(state, user_id, guesses, set(state.get('disqualified', [])))
+    return apply(state, [journal.event(journal.GUESSED, user_id=user_id, guesses=dict(guesses), points=points)], now)
+
+
+def quit_game(state, user_id, player_id, now):
+    if player_id not in state['players']:
+        return state, []
+    e = journal.event(journal.QUIT, player_id=player_id, user_id=user_id)
+    if state.get('host_user_id') == user_id:
+        e['new_host'] = next((p['user_id'] for pid, p in state['players'].items()
+                              if pid != player_id and p.get('user_id')), None)
+    return apply(state, [e], now)
+
+
+def end_game(state, now):
+    if state['phase'] == 'ended_by_host':
+        return state, []
+    return apply(state, [journal.event(journal.ENDED)], now)
+
+
+def count_progress(state):
+    num_submitted = sum(1 for p in state['players'].values() if p.get('submitted'))
+    num_guessed = sum(1 for uid in state['player_user_ids'] if uid in state.get('guesses', {}))
+    return len(state['players']), num_submitted, num_guessed
+
+
+def transition_deadline(state):
+    """Unix time from which the room's next phase transition is due, or None if none is pending.
+
+    A room whose phase is already complete (everyone joined, submitted or
+    guessed) is due from time 0.
+    """
+    num_players, num_submitted, num_guessed = count_progress(state)
+    if state['phase'] == 'joining':
+        return 0 if num_players == NUM_PLAYERS else None
+    if state['phase'] == 'writing':
+        if num_submitted == NUM_PLAYERS: return 0
+        start = state.get('writing_start_time')
+        return None if start is None else start + WRITING_TIME_LIMIT
+    if state['phase'] == 'guessing':
+        if num_guessed == NUM_PLAYERS: return 0
+        start = state.get('guessing_start_time')
+        return None if start is None else start + GUESSING_TIME_LIMIT
+    return None
+
+
+def transition_due(state, now):
+    deadline = transition_deadline(state)
+    return deadline is not None and now >= deadline
+
+
+def guess_points(state, uid, guess_dict, disqualified):
+    """Points one guesser earns: +4 per correct guess, -1 per wrong one, 0 for a skip."""
+    if uid in disqualified or not isinstance(guess_dict, dict): return 0
+    truth = state['true_varna_map']
+    own_pid = state['player_user_ids'].get(uid)
+    pts = 0
+    for pid, guessed_varna in guess_dict.items():
+        if pid == own_pid or guessed_varna is None: continue
+        pts += CORRECT_GUESS_POINTS if truth.get(pid) == guessed_varna else WRONG_GUESS_POINTS
+    return pts
+
+
+def _scored(state, disqualified):
+    if 'guess_points' in state:
+        return ((uid, 0 if uid in disqualified else pts) for uid, pts in state['guess_points'].items())
+    return ((uid, guess_points(state, uid, g, disqualified)) for uid, g in state.get('guesses', {}).items())
+
+
+def round_points(state):
+    """Points earned in the closed round by user id (non-zero only), for a room in `results`."""
+    return {uid: pts for uid, pts in _scored(state, set(state.get('disqualified', []))) if pts}
+
+
+def score(state, disqualified, name_viewer=default_viewer_name):
+    """Round scores by display name for every guess in the room (non-zero totals only).
+
+    Rooms created since guesses are scored on arrival keep the non-zero points
+    in `guess_points`, so only those guessers are visited; older rooms are
+    scored here from their guesses.
+    """
+    player_names = {p.get('user_id'): p.get('name') for p in state['players'].values()}
+    round_scores = {}
+    for uid, pts in _scored(state, disqualified):
+        if pts == 0: continue
+        g_name = player_names.get(uid) or name_viewer(uid)
+        round_scores[g_name] = round_scores.get(g_name, 0) + pts
+    return round_scores
+
+
+def advance(state, now, filler="Time Up", name_viewer=default_viewer_name):
+    """Performs the phase transition due at `now`, if any.
+
+    `filler` replaces the sentences of players who ran out of time and
+    `name_viewer` names viewers on the scoreboard; both are localised by the
+    caller.
+    """
+    if not transition_due(state, now):
+        return state, []
+
+    if state['phase'] == 'joining':
+        e = journal.event(journal.ADVANCED, phase='writing', at=now)
+
+    elif state['phase'] == 'writing':
+        timed_out = [pid for pid, pdata in state['players'].items() if not pdata.get('submitted')]
+        e = journal.event(journal.ADVANCED, phase='guessing', at=now, timed_out=timed_out, filler=filler)
+
+    else:
+        timed_out = [uid for uid in state['player_user_ids'] if uid not in state.get('guesses', {})]
+        disqualified = set(state.get('disqualified', [])) | set(timed_out)
+        e = journal.event(journal.ADVANCED, phase='results', at=now, timed_out=timed_out,
+                          round_scores=score(state, disqualified, name_viewer))
+    return apply(state, [e], now)
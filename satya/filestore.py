@@ -0,0 +1,345 @@
+"""JSON-file room backend: a snapshot document and an event journal per room.
+
+Recorded events are appended to `<id>.events.jsonl`, one minified line each
+in the compact form of `satya.codec`. Snapshots go to a
+temporary file that is renamed over `<id>.json`, so readers only ever see a
+complete document. A snapshot records the journal's size when it was taken
+(`journal_offset`), so loading a room seeks past the events it already holds
+instead of parsing the whole journal. Appends take an flock on the journal (where
+`fcntl` exists) and check its last event against the expected version, so
+processes sharing the directory cannot interleave writes to a room. The signature of a room is the snapshot's file identity
+(inode, size, mtime) plus the journal's size, so checking a cached room for
+freshness costs two stat() calls.
+
+Rooms are sharded into sub-directories by ID prefix (`gamerooms/AB/AB12CD.json`)
+so no single directory grows with the number of rooms; `prepare` moves files
+written by the old flat layout into place. Chat is an append-only
+`<id>.chat.jsonl` next to the state file. The all-time leaderboard is one
+line per finished room in `.leaderboard.jsonl` at the top of the directory.
+"""
+import json
+import os
+import tempfile
+from array import array
+
+from satya import codec
+from satya.backend import ChatLog, RoomBackend, VersionConflict
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single writing process is assumed
+    fcntl = None
+
+SHARD_PREFIX_LEN = 2
+TMP_FILE_TTL_SECONDS = 3600
+LEADERBOARD_FILE = ".leaderboard.jsonl"
+
+
+def _last_seq(f):
+    """The seq of the last complete event in an open journal, or None if it holds none."""
+    end = pos = f.seek(0, os.SEEK_END)
+    tail = b""
+    while pos > 0:
+        pos = max(0, pos - 4096)
+        f.seek(pos)
+        tail = f.read(end - pos)
+        lines = tail.split(b"\n")[:-1]  # only lines ending in a newline are complete
+        for line in reversed(lines[1:] if pos > 0 else lines):
+            try:
+                return json.loads(line)['seq']
+            except (ValueError, KeyError, TypeError):
+                continue  # a garbled line left by a crash
+    return None
+
+
+def _read_jsonl(path, offset=0):
+    """Records of a JSON-lines file from byte `offset`, skipping a torn or garbled line left by a crash."""
+    try:
+        with open(path, 'rb') as f:
+            if offset <= os.fstat(f.fileno()).st_size: f.seek(offset)  # else the file was replaced: read it all
+            lines = f.readlines()
+    except FileNotFoundError:
+        return []
+    records = []
+    for line in lines:
+        if not line.endswith(b"\n"): continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return records
+
+
+class FileChatLog(ChatLog):
+    """Chat as JSON lines; the byte offset of every line is kept so old pages cost one seek."""
+
+    def __init__(self, game_id, path, backend):
+        super().__init__(game_id)
+        self.path = path
+        self.backend = backend
+        self.offsets = array('Q')
+        self.size = 0
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"): break
+                    self.offsets.append(self.size)
+                    self.size += len(line)
+                    self._loaded(json.loads(line))
+                torn = f.tell() != self.size
+            # Truncate only when a crash left a torn final line: an unconditional
+            # truncate bumps the mtime, so merely opening the log would count as activity.
+            if torn: os.truncate(path, self.size)
+
+    def _persist(self, record):
+        line = (codec.dumps(record) + "\n").encode('utf-8')
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, 'ab') as f:
+            f.write(line)
+        self.backend.count_io('chat_appends', len(line))
+        self.offsets.append(self.size)
+        self.size += len(line)
+
+    def _read_stored(self, start, stop):
+        with open(self.path, 'rb') as f:
+            f.seek(self.offsets[start])
+            return [json.loads(f.readline()) for _ in range(start, stop)]
+
+
+class JsonFileBackend(RoomBackend):
+    def __init__(self, game_dir):
+        super().__init__()
+        self.game_dir = game_dir
+
+    def shard_dir(self, game_id):
+        return os.path.join(self.game_dir, game_id[:SHARD_PREFIX_LEN])
+
+    def room_path(self, game_id, suffix):
+        """Path of a per-room file in the room's shard, e.g. `room_path(id, ".json")`."""
+        return os.path.join(self.shard_dir(game_id), f"{game_id}{suffix}")
+
+    def _shards(self):
+        try:
+            return [e.path for e in os.scandir(self.game_dir) if e.is_dir()]
+        except FileNotFoundError:
+            return []
+
+    def prepare(self):
+        self.migrate_flat_layout()
+
+    def migrate_flat_layout(self):
+        """Moves room files from the pre-sharding flat directory into their shards. Returns the count moved."""
+        try:
+            entries = [e for e in os.scandir(self.game_dir) if e.is_file() and not e.name.startswith(".")]
+        except FileNotFoundError:
+            return 0
+        moved = 0
+        for entry in entries:
+            game_id, _, suffix = entry.name.partition(".")
+            target = self.room_path(game_id, "." + suffix)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if not os.path.exists(target):
+                os.replace(entry.path, target)
+                moved += 1
+        return moved
+
+    def signature(self, game_id):
+        try:
+            st = os.stat(self.room_path(game_id, ".json"))
+        except FileNotFoundError:
+            return None
+        try:
+            journal_size = os.stat(self.room_path(game_id, ".events.jsonl")).st_size
+        except FileNotFoundError:
+            journal_size = 0
+        return (st.st_ino, st.st_size, st.st_mtime_ns, journal_size)
+
+    def read(self, game_id):
+        # Take the signature before reading: if a file changes in between, the
+        # next freshness check simply misses instead of serving stale data.
+        signature = self.signature(game_id)
+        if signature is None: return None
+        self.count_io('reads')
+        try:
+            with open(self.room_path(game_id, ".json"), 'r', encoding='utf-8') as f:
+                doc = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        journal_offset = doc.pop('journal_offset', 0)  # absent from snapshots written before it was recorded
+        snapshot = codec.decode_state(doc)
+        snapshot_version = snapshot.get('version', 0)
+        events = [e for e in self.read_events(game_id, journal_offset) if e['seq'] > snapshot_version]
+        return signature, snapshot, events
+
+    def read_events(self, game_id, offset=0):
+        return [codec.decode_event(e) for e in _read_jsonl(self.room_path(game_id, ".events.jsonl"), offset)]
+
+    def append_events(self, game_id, events, previous_version):
+        path = self.room_path(game_id, ".events.jsonl")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = b"".join((codec.dumps(codec.encode_event(e)) + "\n").encode('utf-8') for e in events)
+        with open(path, 'ab+') as f:
+            if fcntl: fcntl.flock(f, fcntl.LOCK_EX)  # released when the file is closed
+            last = _last_seq(f)
+            if last is not None and last != previous_version:  # another process appended first
+                raise VersionConflict(game_id, previous_version, last)
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n": data = b"\n" + data  # fence off a torn line
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.count_io('appends', len(data))
+        return self.signature(game_id)
+
+    def write(self, state, previous_version):
+        path = self.room_path(state['id'], ".json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-", suffix=".json")
+        doc = codec.encode_state(state)
+        try:  # the journal already holds every event up to the snapshot's version
+            doc['journal_offset'] = os.stat(self.room_path(state['id'], ".events.jsonl")).st_size
+        except FileNotFoundError:
+            pass
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(codec.dumps(doc))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path): os.unlink(tmp_path)
+            raise
+        signature = self.signature(state['id'])
+        self.count_io('writes', signature[1])
+        return signature
+
+    def delete(self, game_id):
+        claims = [name[len(game_id):] for name in self._listdir(self.shard_dir(game_id))
+                  if name.startswith(game_id + ".") and name.endswith(".claim")]
+        for suffix in [".json", ".events.jsonl"] + claims:
+            try:
+                os.remove(self.room_path(game_id, suffix))
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _listdir(path):
+        try:
+            return os.listdir(path)
+        except FileNotFoundError:
+            return []
+
+    def claim(self, game_id, token, owner, now, ttl):
+        """Leases are `<id>.<token>.claim` files holding the owner and the time taken.
+
+        A lease is written to a temp file and hard-linked into place, which fails
+        if the lease exists, so a claim file is never seen half-written. An
+        expired lease is renamed aside before it is replaced; if what was moved
+        is not the lease that was read, another claimer got there first.
+        """
+        path = self.room_path(game_id, f".{token}.claim")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-", suffix=".claim")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(f"{owner}\n{now}")
+            for _ in range(2):
+                try:
+                    os.link(tmp_path, path)
+                    return True
+                except FileExistsError:
+                    pass
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        st = os.fstat(f.fileno())
+                        holder, _, taken_at = f.read().rpartition("\n")
+                    try:
+                        taken_at = float(taken_at)
+                    except ValueError:  # unreadable (e.g. written by an older version): held until it is old
+                        taken_at = st.st_mtime
+                    if holder == owner: return True
+                    if now - taken_at < ttl: return False
+                    stale = f"{tmp_path}.stale"
+                    os.rename(path, stale)  # the holder's lease ran out; race the others for a new one
+                    if os.stat(stale).st_ino != st.st_ino:  # moved a lease just taken by someone else: put it back
+                        try:
+                            os.link(stale, path)
+                        except FileExistsError:
+                            pass
+                        os.remove(stale)
+                        return False
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+            return False
+        finally:
+            os.remove(tmp_path)
+
+    def list_ids(self):
+        return [name[:-len(".json")] for shard in self._shards() for name in os.listdir(shard)
+                if name.endswith(".json") and not name.startswith(".")]
+
+    def last_activity(self, game_id):
+        times = []
+        for suffix in (".json", ".events.jsonl", ".chat.jsonl"):
+            try:
+                times.append(os.stat(self.room_path(game_id, suffix)).st_mtime)
+            except FileNotFoundError:
+                pass
+        return max(times, default=None)
+
+    def housekeeping(self, now):
+        """Removes temp files left behind by writers that died mid-write."""
+        for shard in self._shards():
+            for entry in os.scandir(shard):
+                if entry.name.startswith(".tmp-") and now - entry.stat().st_mtime > TMP_FILE_TTL_SECONDS:
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+
+    def open_chat(self, game_id):
+        return FileChatLog(game_id, self.room_path(game_id, ".chat.jsonl"), self)
+
+    def leaderboard_records(self):
+        """The raw per-room lines of the leaderboard file, oldest first."""
+        return _read_jsonl(os.path.join(self.game_dir, LEADERBOARD_FILE))
+
+    def read_leaderboard(self):
+        rows, rooms = {}, set()
+        for record in self.leaderboard_records():
+            if record['room'] in rooms: continue
+            rooms.add(record['room'])
+            for uid, (name, pts) in record['entries'].items():
+                row = rows.setdefault(uid, {"name": None, "score": 0, "games": 0})
+                if name: row['name'] = name
+                row['score'] += pts
+                row['games'] += 1
+        return rows, rooms
+
+    def record_leaderboard(self, game_id, entries, now):
+        """Appends the room's results as one line of the dot-file `LEADERBOARD_FILE` in `game_dir`."""
+        os.makedirs(self.game_dir, exist_ok=True)
+        line = (codec.dumps({"room": game_id, "at": now, "entries": entries}) + "\n").encode('utf-8')
+        with open(os.path.join(self.game_dir, LEADERBOARD_FILE), 'ab') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self.count_io('leaderboard_appends', len(line))
+
+    def room_bytes(self, game_id):
+        """On-disk size of each of the room's files, by kind."""
+        sizes = {}
+        for kind, suffix in (("snapshot", ".json"), ("journal", ".events.jsonl"), ("chat", ".chat.jsonl")):
+            try:
+                sizes[kind] = os.stat(self.room_path(game_id, suffix)).st_size
+            except FileNotFoundError:
+                sizes[kind] = 0
+        return sizes
+
+    def delete_chat(self, game_id):
+        try:
+            os.remove(self.room_path(game_id, ".chat.jsonl"))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,258 @@
+"""Translations, game content and numerals, compiled once per process.
+
+`TRANSLATIONS` is the source catalog. At import it is flattened into one dict
+per language in `CATALOGS` with the English fallback already resolved, and
+strings with `{placeholders}` are split into literal/field parts, so `translate`
+is a dict lookup plus, for templates, a join. Devanagari numerals come from
+one `str.translate` table.
+
+The varna names (`VARNA_DETAILS`), the sentence prompts for each varna and the
+truth marks shown with the results live here too, with varna names indexed both
+ways per language, so the page script that Streamlit re-executes on every rerun
+only holds the page itself.
+"""
+from string import Formatter
+
+DEFAULT_LANG = "sa"
+FALLBACK_LANG = "en"
+DEVANAGARI_DIGITS = str.maketrans("0123456789", "०१२३४५६७८९")
+
+VARNA_DETAILS = {
+    "Brahmin": {"sa": {"name": "ब्राह्मणः"}, "en": {"name": "Brahmin"}},
+    "Kshatriya": {"sa": {"name": "क्षत्रियः"}, "en": {"name": "Kshatriya"}},
+    "Vaishya": {"sa": {"name": "वैश्यः"}, "en": {"name": "Vaishya"}},
+    "Shudra": {"sa": {"name": "शूद्रः"}, "en": {"name": "Shudra"}},
+}
+
+SENTENCE_PROMPTS = {
+    "Brahmin": ["truth_1", "truth_2", "truth_3"],
+    "Kshatriya": ["truth_1", "truth_2", "false_3"],
+    "Vaishya": ["truth_1", "false_2", "false_3"],
+    "Shudra": ["false_1", "false_2", "false_3"]
+}
+
+SENTENCE_MARKS = {
+    "Brahmin": ["✅", "✅", "✅"],
+    "Kshatriya": ["✅", "✅", "❌"],
+    "Vaishya": ["✅", "❌", "❌"],
+    "Shudra": ["❌", "❌", "❌"]
+}
+
+TRANSLATIONS = {
+    "sa": {
+        "lang_select": "भाषा",
+        "game_title": "सत्यासत्यम्",
+        "welcome_intro": "सुस्वागतम्। इयं चतुर्णां क्रीडकानां सत्यासत्यपरीक्षा क्रीडा॥ अत्र एको ब्राह्मणः सर्वसत्यवादी क्षत्रिय एकानृतवादी वैश्य एकसत्यवादी शूद्रश्च सर्वानृतवादी भविष्यति। सर्वेषां वर्णानां सम्यगनुमानमेव तव लक्ष्यम्॥",
+        "how_to_play": "क्रीडाविधिः",
+        "how_to_play_text": "१। चत्वारः क्रीडकाः स्वनाम दत्त्वा प्रविशन्ति।\n\n२। प्रत्येकं क्रीडकः एकं वर्णं प्राप्नोति।\n\n३। स्ववर्णस्य नियमानुसारं स्वविषये त्रीणि वाक्यानि लिख। ब्राह्मणः त्रीणि सत्यानि। क्षत्रियः द्वे सत्ये एकम् असत्यम्। वैश्यः एकं सत्यं द्वे असत्ये। शूद्रः त्रीणि असत्यानि।\n\n४। अन्येषां वाक्यानि पठित्वा तेषां यथार्थवर्णं चिनु।\n\n५। सम्यगनुमानात् ४ अङ्काः प्राप्यन्ते। अशुद्धानुमानात् १ अङ्कः न्यूनीभवति। वर्णो न चितः चेत् ० अङ्काः। पूर्णाङ्काः १२ इतिप्राप्ते 🏆 प्राप्यते।",
+        "create_game_button": "✨ नवीनं क्रीडासत्रं रचय",
+        "quick_play_button": "⚡ शीघ्रं क्रीडासत्रं प्रविश",
+        "quick_play_failed": "क्रीडासत्रं न लब्धम्। पुनः प्रयतस्व।",
+        "your_games": "तव प्रचलन्ति क्रीडासत्राणि",
+        "rejoin": "पुनः प्रविश",
+        "archived_game": "इदं क्रीडासत्रं समाप्तं संगृहीतं च।",
+        "require_names": "नामकरणम् अनिवार्यम्",
+        "enter_name_label": "तव नामाङ्कनं कुरु",
+        "error_name_required": "अनिवार्यत्वात् कृपया स्वनाम लिख।",
+        "error_name_taken": "इदं नाम पूर्वमेव स्वीकृतम्। अन्यत् चिनु।",
+        "join_as": "इति प्रविश",
+        "player": "क्रीडकः",
+        "waiting_for_players": "अन्येषाम् आगमनं प्रतीक्षस्व",
+        "player_count": "॥{count}।{total}॥",
+        "list_number": "{num}।",
+        "truth_1": "प्रथमं सत्यं वाक्यम्", "truth_2": "द्वितीयं सत्यं वाक्यम्", "truth_3": "तृतीयं सत्यं वाक्यम्",
+        "false_1": "प्रथमम् असत्यं वाक्यम्", "false_2": "द्वितीयम् असत्यं वाक्यम्", "false_3": "तृतीयम् असत्यं वाक्यम्",
+        "submit_sentences": "वाक्यानि समर्पय",
+        "error_all_sentences": "कृपया त्रीणि वाक्यानि लिख।",
+        "submission_success": "✅ तव वाक्यानि समर्पितानि। इतरेषां प्रतीक्षां कुरु।",
+        "time_left": "⏳ अवशिष्टः समयः",
+        "time_up": "समयः समाप्तः",
+        "guessing_time": "🤔 अनुमानपर्व",
+        "guessing_instructions": "प्रत्येकस्य क्रीडकस्य यथार्थं वर्णं योजय।",
+        "clear_hint": "--- न चितम् --- इति चिनु। ऋणात्मकाङ्केभ्यो रक्षणाय।",
+        "player_sentences": "वाक्यानि",
+        "your_guesses": "तव अनुमानानि",
+        "submit_guess": "अनुमानं निश्चिनु",
+        "error_unique_guesses": "एकमेव वर्णं द्वयोः क्रीडकयोः दातुं न शक्यते। भिन्नवर्णान् चिनु।",
+        "guess_submitted": "✅ तवानुमानं समर्पितम्। परिणामान् प्रतीक्षस्व।",
+        "status_submitted": "✅ समर्पितम्",
+        "status_writing": "⏳ लिखति",
+        "status_guessing": "⏳ चिन्तयति",
+        "reveal_results": "सर्वेषां परिणामान् प्रकाशय",
+        "results_are_in": "✨ परिणामाः आगताः ✨",
+        "true_varnas": "यथार्थवर्णाः",
+        "sentences_review": "वाक्यानां समीक्षा",
+        "guesses_review": "अनुमानानां समीक्षा",
+        "timeout_guess": "समयसमाप्तेः कारणात् अनुमानं न कृतम्।",
+        "skipped_guess": "न चितम्",
+        "skip_option": "--- न चितम् ---",
+        "true_is": "यथार्थम् {varna}।",
+        "scoring": "🏆 अङ्कगणना",
+        "round_scores": "अस्मिन् चक्रे प्राप्ताङ्काः",
+        "leaderboard": "अङ्कतालिका",
+        "global_leaderboard": "सर्वकालिकी अङ्कतालिका",
+        "your_rank": "तव स्थानम्: {rank}",
+        "points": "अङ्काः",
+        "game_links_expander": "🔗 क्रीडासूत्रं दर्शय",
+        "player_link_info": "क्रीडकेभ्यः सूत्रम्",
+        "viewer_link_info": "दर्शकेभ्यः सूत्रम्",
+        "game_room_not_found": "क्रीडासत्रं न लब्धम्।",
+        "go_to_main_menu": "मुख्यपृष्ठं गच्छ",
+        "end_game": "क्रीडां समापय",
+        "quit_game": "क्रीडां त्यज",
+        "confirm_quit_game": "अपि निश्चयेन त्यक्तुमिच्छसि।",
+        "confirm_end_game": "अपि निश्चयेन सर्वेषां कृते सत्रं समापयितुमिच्छसि।",
+        "yes": "आम्",
+        "game_ended_by_host": "आतिथेयेन क्रीडा समाप्ता॥",
+        "viewer": "दर्शकः",
+        "live_chat": "💬 सम्भाषणस्थलम्",
+        "type_message": "सन्देशं लिख",
+        "send": "प्रेषय",
+        "earlier_messages": "पूर्वसन्देशान् दर्शय"
+    },
+    "en": {
+        "lang_select": "Language",
+        "game_title": "Satyasatyam",
+        "welcome_intro": "Welcome. This is a 4-player game of truth and untruth. One player will be the all-truthful Brahmin, one the 1-lie Kshatriya, one the 1-truth Vaishya, and one the all-lie Shudra. Guessing everyone's identity is your goal.",
+        "how_to_play": "How to Play",
+        "how_to_play_text": "1. Four players join the game by entering their names.\n\n2. Each player is secretly assigned a Varna.\n\n3. Write 3 sentences about yourself based on your rule. (Brahmin = 3 Truths. Kshatriya = 2 Truths, 1 Lie. Vaishya = 1 Truth, 2 Lies. Shudra = 3 Lies.)\n\n4. Read others' sentences and guess their true Varna.\n\n5. Get +4 points for a correct guess, and -1 point for a wrong guess. Leave blank to pass (0 points). Score a perfect 12 to earn a 🏆!",
+        "create_game_button": "✨ Create a New Game Session",
+        "quick_play_button": "⚡ Quick Play (join the next open game)",
+        "quick_play_failed": "No open game could be found. Please try again.",
+        "your_games": "Your games in progress",
+        "rejoin": "Rejoin",
+        "archived_game": "This game has finished and is archived.",
+        "require_names": "Require names",
+        "enter_name_label": "Enter your name",
+        "error_name_required": "A name is required to join this game.",
+        "error_name_taken": "This name is already taken. Please choose another.",
+        "join_as": "Join as",
+        "player": "Player",
+        "waiting_for_players": "Waiting for other players to join",
+        "player_count": "{count}/{total}",
+        "list_number": "{num}.",
+        "truth_1": "First True Sentence", "truth_2": "Second True Sentence", "truth_3": "Third True Sentence",
+        "false_1": "First False Sentence", "false_2": "Second False Sentence", "false_3": "Third False Sentence",
+        "submit_sentences": "Submit Sentences",
+        "error_all_sentences": "Please write three sentences.",
+        "submission_success": "✅ Your sentences are submitted. Waiting for others.",
+        "time_left": "⏳ Time left",
+        "time_up": "Time Up",
+        "guessing_time": "🤔 Guessing Time",
+        "guessing_instructions": "Match each player to their correct Varna.",
+        "clear_hint": "Tip: Select '--- Skip/Pass ---' if you don't want to guess to avoid negative points.",
+        "player_sentences": "Sentences",
+        "your_guesses": "Your Guesses",
+        "submit_guess": "Confirm Guess",
+        "error_unique_guesses": "You cannot assign the same Varna to multiple players. Select unique Varnas.",
+        "guess_submitted": "✅ Your guess is submitted! Waiting for the results.",
+        "status_submitted": "✅ Submitted",
+        "status_writing": "⏳ Writing",
+        "status_guessing": "⏳ Thinking",
+        "reveal_results": "Reveal Results for Everyone",
+        "results_are_in": "✨ The results are in! ✨",
+        "true_varnas": "The True Varnas",
+        "sentences_review": "Sentences Review",
+        "guesses_review": "Guesses Review",
+        "timeout_guess": "Did not guess (Timeout)",
+        "skipped_guess": "Skipped",
+        "skip_option": "--- Skip/Pass ---",
+        "true_is": "(True: {varna})",
+        "scoring": "🏆 Scoring",
+        "round_scores": "Scores This Round",
+        "leaderboard": "Leaderboard",
+        "global_leaderboard": "All-time Leaderboard",
+        "your_rank": "Your rank: {rank}",
+        "points": "points",
+        "game_links_expander": "🔗 Show Game Links",
+        "player_link_info": "Player Link",
+        "viewer_link_info": "Viewer Link",
+        "game_room_not_found": "Game session not found.",
+        "go_to_main_menu": "Go to Main Menu",
+        "end_game": "End Game",
+        "quit_game": "Quit Game",
+        "confirm_quit_game": "Are you sure you want to quit?",
+        "confirm_end_game": "Are you sure? This will end the session for everyone.",
+        "yes": "Yes",
+        "game_ended_by_host": "The game was ended by the host.",
+        "viewer": "Viewer",
+        "live_chat": "💬 Live Chat",
+        "type_message": "Type a message",
+        "send": "Send",
+        "earlier_messages": "Show earlier messages"
+    }
+}
+
+
+def to_devanagari(value):
+    """Replaces ASCII digits with Devanagari ones, leaving signs and other characters alone."""
+    return str(value).translate(DEVANAGARI_DIGITS)
+
+
+def numerals(value, lang):
+    """`value` as a string in the language's numerals."""
+    return to_devanagari(value) if lang == "sa" else str(value)
+
+
+def varna_name(varna_key, lang):
+    return (VARNA_NAMES.get(lang) or VARNA_NAMES[FALLBACK_LANG])[varna_key]
+
+
+def varna_key(name, lang):
+    """The varna whose name in `lang` is `name`."""
+    return (VARNA_KEYS_BY_NAME.get(lang) or VARNA_KEYS_BY_NAME[FALLBACK_LANG])[name]
+
+
+def list_number(value, lang):
+    """A list item's number: "2." or "२।" in Sanskrit."""
+    return translate(lang, 'list_number', num=numerals(value, lang))
+
+
+def player_number(player_id, lang):
+    """The slot number of `player_id` in the language's numerals, or "V" for a viewer."""
+    if not player_id: return "V"
+    return numerals(player_id.split('_')[1], lang)
+
+
+def player_label(player_id, player, host_user_id, lang):
+    """A player as listed on the page: "2. Name", or "२। Name" in Sanskrit, with 👑 for the host."""
+    host_str = " 👑" if player.get('user_id') == host_user_id else ""
+    return f"{list_number(player_id.split('_')[1], lang)} {player['name']}{host_str}"
+
+
+def viewer_name(uid, lang):
+    """How a viewer is named on scoreboards: "Viewer" and the first four characters of their ID."""
+    return f"{translate(lang, 'viewer')} {numerals(uid[:4], lang)}"
+
+
+def _parse(text):
+    """Literal/field parts of a template, or None for plain text and anything beyond `{name}` fields."""
+    try:
+        parts = list(Formatter().parse(text))
+    except ValueError:
+        return None
+    if all(field is None for _, field, _, _ in parts): return None
+    if any(field == "" or field and (spec or conversion) for _, field, spec, conversion in parts): return None
+    return tuple((literal, field) for literal, field, _, _ in parts)
+
+
+def _compile(lang):
+    own, fallback = TRANSLATIONS.get(lang, {}), TRANSLATIONS[FALLBACK_LANG]
+    return {key: own.get(key) or fallback.get(key, key) for key in {**fallback, **own}}
+
+
+CATALOGS = {lang: _compile(lang) for lang in TRANSLATIONS}
+TEMPLATES = {lang: {key: parts for key, text in catalog.items() if (parts := _parse(text))}
+             for lang, catalog in CATALOGS.items()}
+VARNA_NAMES = {lang: {key: details[lang]['name'] for key, details in VARNA_DETAILS.items()} for lang in TRANSLATIONS}
+VARNA_KEYS_BY_NAME = {lang: {name: key for key, name in names.items()} for lang, names in VARNA_NAMES.items()}
+
+
+def translate(lang, key, **kwargs):
+    """The text for `key` in `lang` (falling back to English, then to the key), filled with `kwargs`."""
+    catalog = CATALOGS.get(lang) or CATALOGS[FALLBACK_LANG]
+    text = catalog.get(key, key)
+    if not kwargs: return text
+    parts = (TEMPLATES.get(lang) or TEMPLATES[FALLBACK_LANG]).get(key)
+    if parts is None: return text.format(**kwargs)
+    return "".join(literal + (str(kwargs[field]) if field is not None else "") for literal, field in parts)
@@ -0,0 +1,127 @@
+"""Typed game events and the fold that derives room state from them.
+
+Every action in a room is recorded as one small event in the room's append-only
+journal; the room's `version` is the sequence number of its latest event. The
+stored room document is only a snapshot of the fold at some version, rewritten
+every SNAPSHOT_EVERY events, so loading a room replays at most that many
+events while the journal keeps the full history for audits and deterministic
+replays (`replay`).
+
+Folding works in place on a mutable state, or copy-on-write on a frozen one:
+each event copies only the containers it changes (`_own`), so recording a
+guess copies the room's top level and its `guesses` dict rather than the whole
+room.
+
+Events carry everything needed to apply them, including values that were
+decided at the time (timeouts, the new host, round scores), so folding never
+depends on the clock, randomness or a session's language.
+"""
+from satya.cache import DraftDict, FrozenDict, thaw
+
+SNAPSHOT_EVERY = 25
+
+CREATED = "created"
+JOINED = "joined"
+SUBMITTED = "submitted"
+GUESSED = "guessed"
+QUIT = "quit"
+ENDED = "ended"
+ADVANCED = "advanced"
+
+
+def event(kind, **data):
+    """Builds an event; the store adds its `seq` and `at` when it is recorded."""
+    return {"type": kind, **data}
+
+
+def _own(parent, key, empty=dict):
+    """The container at `parent[key]`, replaced by a mutable copy first if it is frozen (or missing)."""
+    value = parent.get(key)
+    if value is None: value = empty()
+    elif isinstance(value, FrozenDict): value = DraftDict(value)
+    elif isinstance(value, tuple): value = list(value)
+    else: return value
+    parent[key] = value
+    return value
+
+
+def _created(state, e):
+    return thaw(e['state'])
+
+
+def _joined(state, e):
+    _own(state, 'players')[e['player_id']] = {"name": e['name'], "user_id": e['user_id']}
+    _own(state, 'player_user_ids')[e['user_id']] = e['player_id']
+    if e['name'] not in state['scores']: _own(state, 'scores')[e['name']] = 0
+
+
+def _submitted(state, e):
+    player = _own(_own(state, 'players'), e['player_id'])
+    player['sentences'] = list(e['sentences'])
+    player['submitted'] = True
+
+
+def _guessed(state, e):
+    _own(state, 'guesses')[e['user_id']] = thaw(e['guesses'])
+    if e.get('points') and 'guess_points' in state:
+        _own(state, 'guess_points')[e['user_id']] = e['points']
+
+
+def _quit(state, e):
+    _own(state, 'players').pop(e['player_id'], None)
+    _own(state, 'player_user_ids').pop(e['user_id'], None)
+    if 'new_host' in e: state['host_user_id'] = e['new_host']
+
+
+def _ended(state, e):
+    state['phase'] = 'ended_by_host'
+
+
+def _advanced(state, e):
+    phase = e['phase']
+    if phase == 'writing':
+        state['writing_start_time'] = e['at']
+    elif phase == 'guessing':
+        for pid in e.get('timed_out', []):
+            pdata = _own(_own(state, 'players'), pid)
+            pdata['sentences'] = [e['filler']] * 3
+            pdata['submitted'] = True
+            _own(state, 'disqualified', list).append(pdata['user_id'])
+        state['guessing_start_time'] = e['at']
+    elif phase == 'results':
+        for uid in e.get('timed_out', []):
+            _own(state, 'guesses')[uid] = "TIMEOUT"
+            _own(state, 'disqualified', list).append(uid)
+        scores = _own(state, 'scores')
+        for name, pts in e['round_scores'].items():
+            scores[name] = scores.get(name, 0) + pts
+        state['last_round_scores'] = dict(e['round_scores'])
+    state['phase'] = phase
+
+
+_APPLY = {CREATED: _created, JOINED: _joined, SUBMITTED: _submitted, GUESSED: _guessed,
+          QUIT: _quit, ENDED: _ended, ADVANCED: _advanced}
+
+
+def apply_event(state, e):
+    """Applies one recorded event to a mutable state and returns the (possibly new) state."""
+    state = _APPLY[e['type']](state, e) or state
+    state['version'] = e['seq']
+    return state
+
+
+def fold(state, events):
+    """Applies `events` in order. A frozen state is not modified: the result shares its unchanged parts."""
+    if isinstance(state, FrozenDict): state = DraftDict(state)
+    for e in events:
+        state = apply_event(state, e)
+    return state
+
+
+def replay(events, upto_seq=None):
+    """Rebuilds a room from its full journal, optionally stopping at `upto_seq`."""
+    state = None
+    for e in events:
+        if upto_seq is not None and e['seq'] > upto_seq: break
+        state = apply_event(state, e)
+    return state
@@ -0,0 +1,118 @@
+"""Room and all-time leaderboards kept as sorted indexes.
+
+`Standings` keeps entries in a list sorted by (-score, key) next to a dict of
+current scores, so an update is a bisect out and back in, the top N is a slice
+and a rank is one bisect; nothing is re-sorted on a rerun.
+
+A room's standings are built once per room version and shared by every session
+(`room_standings`). The all-time `GlobalLeaderboard` is keyed by user ID and
+persisted by the active backend: when a room enters `results`, `store`
+records the round once per room (`record_round`), and the index is loaded from
+the backend when a process first needs it.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+
+from satya import engine
+from satya.cache import LRUCache
+
+ROOM_STANDINGS_CACHE_SIZE = 256
+TOP_N = 10
+
+
+class Standings:
+    """Scores by key with O(log n) rank lookups and ordered top-N reads."""
+
+    def __init__(self, scores=()):
+        self.scores = dict(scores)
+        self._order = sorted((-score, key) for key, score in self.scores.items())
+
+    def __len__(self):
+        return len(self._order)
+
+    def set(self, key, score):
+        old = self.scores.get(key)
+        if old is not None:
+            del self._order[bisect_left(self._order, (-old, key))]
+        self.scores[key] = score
+        insort(self._order, (-score, key))
+
+    def add(self, key, points):
+        self.set(key, self.scores.get(key, 0) + points)
+
+    def top(self, n=TOP_N):
+        """The `n` best `(key, score)` pairs, highest first (ties by key)."""
+        return [(key, -neg) for neg, key in self._order[:n]]
+
+    def rank(self, key):
+        """1-based rank of `key` (equal scores share a rank), or None if it has no score."""
+        score = self.scores.get(key)
+        if score is None: return None
+        return bisect_left(self._order, (-score,)) + 1
+
+
+_room_standings = LRUCache(ROOM_STANDINGS_CACHE_SIZE)
+
+
+def room_standings(state):
+    """The room's `Standings` by display name, built once per room version."""
+    version = state.get('version')
+    entry = _room_standings.get(state['id'], is_fresh=lambda e: e[0] == version)
+    if entry is None:
+        entry = (version, Standings(state.get('scores', {})))
+        _room_standings.put(state['id'], entry)
+    return entry[1]
+
+
+def round_entries(state):
+    """Per-user results of a room that just entered `results`: `{user_id: (name, points)}`.
+
+    Every player is included, plus each viewer who scored; viewers have no name.
+    """
+    points = engine.round_points(state)
+    entries = {p['user_id']: (p['name'], points.get(p['user_id'], 0))
+               for p in state['players'].values() if p.get('user_id')}
+    for uid, pts in points.items():
+        entries.setdefault(uid, (None, pts))
+    return entries
+
+
+class GlobalLeaderboard:
+    """All-time scores by user ID over every finished room in a backend."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.lock = threading.Lock()
+        rows, self.rooms = backend.read_leaderboard()
+        self.names = {uid: row['name'] for uid, row in rows.items()}
+        self.games = {uid: row['games'] for uid, row in rows.items()}
+        self.standings = Standings({uid: row['score'] for uid, row in rows.items()})
+
+    def record_round(self, state, now=None):
+        """Adds a finished room's results once; returns False if the room was already counted."""
+        game_id = state['id']
+        with self.lock:
+            if game_id in self.rooms: return False
+            entries = round_entries(state)
+            self.backend.record_leaderboard(game_id, entries, time.time() if now is None else now)
+            self.rooms.add(game_id)
+            for uid, (name, pts) in entries.items():
+                if name: self.names[uid] = name
+                self.games[uid] = self.games.get(uid, 0) + 1
+                self.standings.add(uid, pts)
+            return True
+
+    def top(self, n=TOP_N):
+        """`[{"user_id", "name", "score", "games"}]` for the `n` best players."""
+        with self.lock:
+            return [{"user_id": uid, "name": self.names.get(uid), "score": score, "games": self.games.get(uid, 0)}
+                    for uid, score in self.standings.top(n)]
+
+    def rank(self, user_id):
+        with self.lock:
+            return self.standings.rank(user_id)
+
+    def score(self, user_id):
+        with self.lock:
+            return self.standings.scores.get(user_id)
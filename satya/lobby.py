@@ -0,0 +1,212 @@
+"""Room and membership indexes, room ID allocation and the quick-play queue.
+
+The index maps every room to its phase and free player slots and is kept up to
+date by the store's commit and delete listeners, so finding rooms never lists or
+parses storage. It is seeded from the stored rooms when the process first starts
+it. Rooms written by other processes sharing the backend show up in the index
+once this process commits to them or seats a session in them.
+
+The membership index maps each user to the rooms they play in and their slot,
+along with the room version it was last updated at, so listing a user's live
+rooms for reconnecting (`active_rooms`) is a dict lookup. Resolving a session's
+player slot (`seat`) reads the room through the store's cache, which checks
+the stored version, and re-indexes the room when it moved on.
+
+Quick-play rooms (`settings['quick_play']`) that are still joining are bucketed
+by free slots. A quick-play join takes the oldest room in the fullest non-empty
+bucket, so at most NUM_PLAYERS buckets are looked at, and seats the user in its
+first free slot. When no such room is open, it starts one with the user as host.
+A room leaves the queue when its fourth player joins, and the scheduler then
+starts the round as usual.
+
+New room IDs are checked against the index, the backend and the archive before
+use, so an archived room's link never leads to a new room. If another process
+still creates the same ID first, `create_game_state` refuses it and a new ID is
+drawn.
+"""
+import threading
+import time
+import uuid
+
+from satya import archive, engine, metrics, store
+from satya.backend import VersionConflict
+
+LIVE_PHASES = ("joining", "writing", "guessing")
+QUICK_PLAY_ATTEMPTS = 5
+ROOM_ID_ATTEMPTS = 20
+
+_lock = threading.Lock()
+_rooms = {}     # game_id -> (phase, free slots, quick play)
+_by_phase = {}  # phase -> set of game_ids
+_open = [{} for _ in range(engine.NUM_PLAYERS + 1)]  # free slots -> joining quick-play rooms, oldest first
+_members = {}       # user_id -> {game_id: player_id}
+_room_members = {}  # game_id -> ({user_id: player_id}, version)
+_stats = {"quick_play_joins": 0, "quick_play_rooms": 0, "id_collisions": 0}
+_started = False
+_start_lock = threading.Lock()
+
+
+def _index_members(game_id, members, version):
+    old = _room_members.get(game_id, ({}, None))[0]
+    if old != members:
+        for uid in old.keys() - members.keys():
+            rooms = _members.get(uid, {})
+            rooms.pop(game_id, None)
+            if not rooms: _members.pop(uid, None)
+        for uid, pid in members.items():
+            _members.setdefault(uid, {})[game_id] = pid
+    _room_members[game_id] = (members, version)
+
+
+def _unindex(game_id):
+    entry = _rooms.pop(game_id, None)
+    if entry is None: return
+    phase, free, quick = entry
+    _by_phase[phase].discard(game_id)
+    if quick and phase == 'joining': _open[free].pop(game_id, None)
+
+
+def note_state(state):
+    """Commit listener: re-indexes the room from its latest state."""
+    game_id, phase = state['id'], state['phase']
+    entry = (phase, len(engine.available_slots(state)), bool(state.get('settings', {}).get('quick_play')))
+    with _lock:
+        _index_members(game_id, dict(state['player_user_ids']), state.get('version', 0))
+        if _rooms.get(game_id) == entry: return
+        _unindex(game_id)
+        _rooms[game_id] = entry
+        _by_phase.setdefault(phase, set()).add(game_id)
+        if entry[2] and phase == 'joining' and entry[1]: _open[entry[1]][game_id] = True
+
+
+def forget(game_id):
+    """Delete listener: drops the room from the index."""
+    with _lock:
+        _unindex(game_id)
+        _index_members(game_id, {}, None)
+        del _room_members[game_id]
+
+
+def rooms_in_phase(phase):
+    with _lock:
+        return set(_by_phase.get(phase, ()))
+
+
+def free_slots(game_id):
+    """Free player slots of an indexed room, or None if the room is not indexed."""
+    entry = _rooms.get(game_id)
+    return entry[1] if entry else None
+
+
+def seat(user_id, game_id):
+    """The user's player slot in the room, or None; re-indexes the room when its stored version moved on."""
+    if not game_id: return None
+    state = store.load_game_state(game_id)
+    if state is None: return None
+    with _lock:
+        entry = _room_members.get(game_id)
+    if entry is None or entry[1] != state['version']: note_state(state)
+    return state['player_user_ids'].get(user_id)
+
+
+def active_rooms(user_id):
+    """`[{"game_id", "player_id", "phase", "version"}]` for the user's rooms that are still being played."""
+    with _lock:
+        return [{"game_id": game_id, "player_id": pid, "phase": _rooms[game_id][0],
+                 "version": _room_members[game_id][1]}
+                for game_id, pid in sorted(_members.get(user_id, {}).items())
+                if _rooms.get(game_id, (None,))[0] in LIVE_PHASES]
+
+
+def open_room():
+    """The joining quick-play room closest to full, oldest first, or None."""
+    with _lock:
+        for bucket in _open[1:]:
+            if bucket: return next(iter(bucket))
+    return None
+
+
+def new_room_id():
+    """A six-character room ID not used by any indexed, stored or archived room."""
+    for _ in range(ROOM_ID_ATTEMPTS):
+        game_id = uuid.uuid4().hex[:6].upper()
+        if game_id not in _rooms and not store.room_exists(game_id) and game_id not in archive.get_archive():
+            return game_id
+        _stats["id_collisions"] += 1
+    raise RuntimeError("could not allocate a free room ID")
+
+
+def create_room(settings, host_user_id):
+    """Creates and stores a new room under a fresh ID; returns its state."""
+    while True:
+        try:
+            return store.create_game_state(engine.get_initial_state(new_room_id(), settings, host_user_id))
+        except VersionConflict:  # another process took the ID in between
+            _stats["id_collisions"] += 1
+
+
+def _join_first_free(user_id, name_for, now):
+    def step(state):
+        slots = engine.available_slots(state)
+        if not slots or user_id in state['player_user_ids']: return state, []
+        return engine.join(state, user_id, slots[0], name_for(slots[0]), now)
+    return step
+
+
+def quick_play(user_id, name_for, lang, now=None):
+    """Seats the user in an open quick-play room, starting one if none is open.
+
+    `name_for(player_id)` gives the player's default name for the slot they
+    get. Returns `(game_id, player_id)`, or None if every attempt lost a race
+    for the last free slot.
+    """
+    now = time.time() if now is None else now
+    for _ in range(QUICK_PLAY_ATTEMPTS):
+        game_id = open_room()
+        if game_id is None:
+            game_id = create_room({"require_names": False, "lang": lang, "quick_play": True}, user_id)['id']
+            _stats["quick_play_rooms"] += 1
+        state = store.record_events(game_id, _join_first_free(user_id, name_for, now))
+        if state is None:  # reaped since it was indexed
+            forget(game_id)
+            continue
+        player_id = state['player_user_ids'].get(user_id)
+        if player_id:
+            _stats["quick_play_joins"] += 1
+            return game_id, player_id
+        note_state(state)
+    return None
+
+
+def lobby_stats():
+    with _lock:
+        return {**_stats, "rooms": len(_rooms), "members": len(_members),
+                "by_phase": {phase: len(ids) for phase, ids in _by_phase.items()},
+                "open_quick_play": sum(len(bucket) for bucket in _open)}
+
+
+def _collect_metrics():
+    stats = lobby_stats()
+    for phase, n in sorted(stats["by_phase"].items()):
+        yield ("satya_indexed_rooms", "gauge", "Rooms in the lobby index by phase.", (("phase", phase),), n)
+    yield ("satya_indexed_members", "gauge", "Users seated in at least one indexed room.", (), stats["members"])
+    yield ("satya_open_quick_play_rooms", "gauge", "Quick-play rooms waiting for players.", (), stats["open_quick_play"])
+    yield ("satya_quick_play_joins_total", "counter", "Users seated by quick play.", (), stats["quick_play_joins"])
+    yield ("satya_room_id_collisions_total", "counter", "Room IDs drawn again because they were taken.", (),
+           stats["id_collisions"])
+
+
+metrics.register_collector(_collect_metrics)
+
+
+def ensure_started():
+    """Hooks the index into the store and seeds it from the stored rooms, once per process."""
+    global _started
+    with _start_lock:
+        if _started: return
+        _started = True
+        store.add_commit_listener(note_state)
+        store.add_delete_listener(forget)
+        for game_id in store.list_game_ids():
+            state = store.load_game_state(game_id, populate_cache=False)
+            if state is not None: note_state(state)
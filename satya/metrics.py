@@ -0,0 +1,240 @@
+"""Process-wide metrics in Prometheus text format, plus an opt-in per-room sampling profiler.
+
+Code records counters (`inc`) and timing or size histograms (`observe`, or a
+`span` around a block). Modules that already keep their own counters (the state
+cache, backend I/O, the reaper and the scheduler) register a collector instead,
+which is read at export time. `render()` returns the exposition text.
+
+`ensure_started` exports it according to the environment:
+
+    SATYA_METRICS_PORT=9464      serve GET /metrics on 127.0.0.1
+    SATYA_METRICS_FILE=path      rewrite the file every METRICS_FILE_INTERVAL_SECONDS
+    SATYA_PROFILE_ROOM=<id>      sample stacks of threads serving that room and
+                                 write them, collapsed for flame graphs, to
+                                 profile-<id>.folded next to the metrics file
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = os.environ.get("SATYA_METRICS_PORT")
+METRICS_FILE = os.environ.get("SATYA_METRICS_FILE")
+PROFILE_ROOM = os.environ.get("SATYA_PROFILE_ROOM")
+METRICS_FILE_INTERVAL_SECONDS = 15
+PROFILE_INTERVAL_SECONDS = 0.01
+SESSION_IDLE_SECONDS = 60
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+_buckets = {}     # histogram name -> bucket bounds
+_help = {}
+_collectors = []
+_sessions = {}    # session key -> last seen
+_current_room = {}  # thread ident -> room being served
+_started = False
+_start_lock = threading.Lock()
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, n=1, help="", **labels):
+    with _lock:
+        key = _key(name, labels)
+        _counters[key] = _counters.get(key, 0) + n
+        if help: _help.setdefault(name, help)
+
+
+def observe(name, value, buckets=SECONDS_BUCKETS, help="", **labels):
+    with _lock:
+        bounds = _buckets.setdefault(name, buckets)
+        key = _key(name, labels)
+        h = _histograms.get(key)
+        if h is None: h = _histograms[key] = [0] * len(bounds) + [0, 0]
+        for i, bound in enumerate(bounds):
+            if value <= bound: h[i] += 1
+        h[-2] += value
+        h[-1] += 1
+        if help: _help.setdefault(name, help)
+
+
+@contextmanager
+def span(name, help="", **labels):
+    """Times the block into the seconds histogram `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, help=help, **labels)
+
+
+def register_collector(collect):
+    """Adds `collect()`, which yields `(name, type, help, labels, value)` samples at export time."""
+    _collectors.append(collect)
+
+
+def touch_session(session_key):
+    """Marks a browser session as live (watching a room) for the `satya_live_sessions` gauge."""
+    with _lock:
+        _sessions[session_key] = time.time()
+
+
+@contextmanager
+def serving_room(game_id):
+    """Marks the calling thread as rendering `game_id` for the block, for the per-room profiler."""
+    ident = threading.get_ident()
+    _current_room[ident] = game_id
+    try:
+        yield
+    finally:
+        _current_room.pop(ident, None)
+
+
+def _labels(labels):
+    if not labels: return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+def _own_samples():
+    now = time.time()
+    for key in [k for k, seen in _sessions.items() if now - seen > SESSION_IDLE_SECONDS]:
+        del _sessions[key]
+    yield ("satya_live_sessions", "gauge", "Sessions that watched a room in the last minute.", (), len(_sessions))
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines, typed = [], set()
+
+    def header(name, kind, help):
+        if name in typed: return
+        typed.add(name)
+        if help: lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    with _lock:
+        counters, histograms, helps = dict(_counters), {k: list(v) for k, v in _histograms.items()}, dict(_help)
+        samples = list(_own_samples())
+    for (name, labels), value in sorted(counters.items()):
+        header(name, "counter", helps.get(name))
+        lines.append(f"{name}{_labels(labels)} {value}")
+    for (name, labels), h in sorted(histograms.items()):
+        header(name, "histogram", helps.get(name))
+        for bound, count in zip(_buckets[name], h):
+            lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {count}")
+        lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {h[-1]}")
+        lines.append(f"{name}_sum{_labels(labels)} {h[-2]}")
+        lines.append(f"{name}_count{_labels(labels)} {h[-1]}")
+    for collect in _collectors:
+        try:
+            samples.extend(collect())
+        except Exception:
+            log.exception("metrics collector failed")
+    for name, kind, help, labels, value in samples:
+        header(name, kind, help)
+        lines.append(f"{name}{_labels(tuple(sorted(dict(labels).items())))} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path):
+    """Atomically rewrites `path` with the current metrics (node_exporter textfile format)."""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RoomProfiler:
+    """Samples the stacks of threads serving one room; `folded()` gives flame-graph input."""
+
+    def __init__(self, game_id, interval=PROFILE_INTERVAL_SECONDS):
+        self.game_id, self.interval = game_id, interval
+        self.stacks = {}
+        self.lock = threading.Lock()  # the sampler adds stacks while `folded` reads them
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"satya-profiler-{game_id}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, room in list(_current_room.items()):
+                frame = frames.get(ident) if room == self.game_id else None
+                if frame is None: continue
+                stack = []
+                while frame is not None:
+                    stack.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)})")
+                    frame = frame.f_back
+                key = ";".join(reversed(stack))
+                with self.lock:
+                    self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def folded(self):
+        with self.lock:
+            stacks = sorted(self.stacks.items())
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+
+def _export_loop(profiler):
+    while True:
+        time.sleep(METRICS_FILE_INTERVAL_SECONDS)
+        try:
+            if METRICS_FILE: write_textfile(METRICS_FILE)
+            if profiler:
+                path = os.path.join(os.path.dirname(METRICS_FILE or "") or ".", f"profile-{profiler.game_id}.folded")
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(profiler.folded())
+        except Exception:  # keep exporting after a failed round
+            log.exception("metrics export failed")
+
+
+def ensure_started():
+    """Starts the exporters configured in the environment, once per process."""
+    global _started
+    with _start_lock:
+        if _started: return
+        _started = True
+    if METRICS_PORT:
+        try:
+            server = ThreadingHTTPServer(("127.0.0.1", int(METRICS_PORT)), _Handler)
+        except (OSError, ValueError):  # e.g. the port is taken; the page must still load
+            log.exception("metrics server could not listen on port %s", METRICS_PORT)
+        else:
+            threading.Thread(target=server.serve_forever, name="satya-metrics", daemon=True).start()
+    profiler = RoomProfiler(PROFILE_ROOM).start() if PROFILE_ROOM else None
+    if METRICS_FILE or profiler:
+        threading.Thread(target=_export_loop, args=(profiler,), name="satya-metrics-export", daemon=True).start()
@@ -0,0 +1,51 @@
+"""Imports rooms, journals, chat and the all-time leaderboard from the JSON-file layout into a SQLite database.
+
+    python -m satya.migrate [--game-dir gamerooms] [--db gamerooms.sqlite3]
+
+Rooms already present in the database at the same or a newer version are left
+alone, so the import can be re-run safely. Both the sharded and the old flat
+file layouts are read.
+"""
+import argparse
+
+from satya import journal, store
+from satya.filestore import JsonFileBackend
+from satya.sqlitestore import SqliteBackend
+
+
+def import_json_rooms(source, target):
+    """Copies every room from `source` (a JsonFileBackend) into `target`. Returns the IDs imported."""
+    imported = []
+    for game_id in source.list_ids():
+        result = source.read(game_id)
+        if result is None: continue
+        _, snapshot, events = result
+        state = journal.fold(snapshot, events)
+        existing = target.signature(game_id)
+        if existing is not None and existing >= state.get('version', 0): continue
+        state.setdefault('version', 1)
+        target.write(state, existing or 0)
+        target.import_events(game_id, source.read_events(game_id))
+        chat_log = source.open_chat(game_id)
+        target.import_chat(game_id, chat_log.read(0, chat_log.count))
+        imported.append(game_id)
+    for record in source.leaderboard_records():
+        target.record_leaderboard(record['room'], record['entries'], record['at'])
+    return imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--game-dir", default=store.GAME_DIR)
+    parser.add_argument("--db", default=store.SQLITE_PATH)
+    args = parser.parse_args(argv)
+
+    source, target = JsonFileBackend(args.game_dir), SqliteBackend(args.db)
+    source.prepare()
+    target.prepare()
+    imported = import_json_rooms(source, target)
+    print(f"imported {len(imported)} room(s) into {args.db}")
+
+
+if __name__ == "__main__":
+    main()
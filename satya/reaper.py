@@ -0,0 +1,117 @@
+"""Background reaper that archives finished rooms and expires idle ones by phase.
+
+A room's last activity is its newest state or chat write. A finished room
+(`results` or `ended_by_host`) idle for ARCHIVE_AFTER_SECONDS is moved, with
+its journal and chat, into the compressed archive (see `satya.archive`), where its link
+keeps working. Any other room idle for longer than the TTL for its phase is
+deleted with its chat. The reaper runs in one daemon thread per process; `ensure_started` is
+safe to call on every rerun.
+"""
+import logging
+import threading
+import time
+
+from satya import archive, chat, metrics, store
+
+REAP_INTERVAL_SECONDS = 300
+ROOM_TTL_SECONDS = {
+    "joining": 30 * 60,          # abandoned lobbies
+    "writing": 2 * 3600,
+    "guessing": 2 * 3600,
+}
+DEFAULT_TTL_SECONDS = 12 * 3600
+ARCHIVE_AFTER_SECONDS = 15 * 60
+
+log = logging.getLogger(__name__)
+
+_stats_lock = threading.Lock()
+_stats = {"sweeps": 0, "reaped_total": 0, "reaped_by_phase": {}, "archived_total": 0, "live_rooms": 0,
+          "live_by_phase": {}, "last_sweep_at": None}
+_started = False
+_start_lock = threading.Lock()
+
+
+def _remove(game_id):
+    store.delete_game_state(game_id)
+    chat.delete_chat(game_id)
+
+
+def reap_once(now=None):
+    """Runs one sweep and returns the IDs of the rooms it deleted or archived."""
+    now = time.time() if now is None else now
+    reaped, finished, live_by_phase = [], [], {}
+    for game_id in store.list_game_ids():
+        with store.room_lock(game_id):
+            state = store.load_game_state(game_id, populate_cache=False)
+            last_activity = store.last_activity(game_id)
+            if state is None or last_activity is None: continue
+            phase = state.get('phase')
+            if phase in archive.FINISHED_PHASES and now - last_activity >= ARCHIVE_AFTER_SECONDS:
+                finished.append((state, store.game_journal(game_id), chat.all_messages(game_id), last_activity))
+            elif now - last_activity >= ROOM_TTL_SECONDS.get(phase, DEFAULT_TTL_SECONDS):
+                _remove(game_id)
+                reaped.append((game_id, phase))
+            else:
+                live_by_phase[phase] = live_by_phase.get(phase, 0) + 1
+
+    archived = set(archive.get_archive().add([room[:3] for room in finished], now))
+    for state, _, _, last_activity in finished:
+        game_id, phase = state['id'], state['phase']
+        if game_id not in archived:  # an ID the archive cannot key: expire it like any other room
+            if now - last_activity < DEFAULT_TTL_SECONDS:
+                live_by_phase[phase] = live_by_phase.get(phase, 0) + 1
+                continue
+        with store.room_lock(game_id):
+            if store.last_activity(game_id) == last_activity:  # unchanged since it was archived
+                _remove(game_id)
+                reaped.append((game_id, phase))
+    store.get_backend().housekeeping(now)
+
+    with _stats_lock:
+        _stats["sweeps"] += 1
+        _stats["reaped_total"] += len(reaped)
+        _stats["archived_total"] += len(archived)
+        for _, phase in reaped:
+            _stats["reaped_by_phase"][phase] = _stats["reaped_by_phase"].get(phase, 0) + 1
+        _stats["live_by_phase"] = live_by_phase
+        _stats["live_rooms"] = sum(live_by_phase.values())
+        _stats["last_sweep_at"] = now
+    return [game_id for game_id, _ in reaped]
+
+
+def reaper_stats():
+    """Counters from the sweeps so far: rooms reaped (total and per phase) and live rooms."""
+    with _stats_lock:
+        return {**_stats, "reaped_by_phase": dict(_stats["reaped_by_phase"]),
+                "live_by_phase": dict(_stats["live_by_phase"])}
+
+
+def _run():
+    while True:
+        try:
+            reap_once()
+        except Exception:  # a bad file must not kill the reaper thread
+            log.exception("room sweep failed")
+        time.sleep(REAP_INTERVAL_SECONDS)
+
+
+def ensure_started():
+    """Prepares the room backend and starts the reaper thread, once per process."""
+    global _started
+    with _start_lock:
+        if _started: return
+        _started = True
+        store.get_backend()
+    threading.Thread(target=_run, name="satya-reaper", daemon=True).start()
+
+
+def _collect_metrics():
+    stats = reaper_stats()
+    for phase, n in sorted(stats["live_by_phase"].items()):
+        yield ("satya_live_rooms", "gauge", "Rooms per phase at the last sweep.", (("phase", phase),), n)
+    for phase, n in sorted(stats["reaped_by_phase"].items()):
+        yield ("satya_reaped_rooms_total", "counter", "Rooms expired by the reaper.", (("phase", phase),), n)
+    yield ("satya_archived_rooms_total", "counter", "Finished rooms moved to the archive.", (), stats["archived_total"])
+
+
+metrics.register_collector(_collect_metrics)
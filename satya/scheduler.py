@@ -0,0 +1,139 @@
+"""Background scheduler that performs phase transitions when they fall due.
+
+Every committed room reports its next transition deadline
+(`engine.transition_deadline`): the end of the writing or guessing timer, or
+"now" once everyone has joined, submitted or guessed. Deadlines sit in a
+min-heap, and one daemon thread per process sleeps until the earliest one,
+then advances that room with the same timeout, disqualification and scoring
+rules the page used to apply itself. Clients see the commit on their next
+poll of the cached room, so page reruns only read.
+
+Each transition has a single writer. Within a process that is this thread
+(under the room's lock). Across processes sharing a backend, the writer is
+whichever process claims the transition's lease (`store.claim_transition`,
+keyed by the phase being left). The others re-read the room shortly afterwards
+and reschedule it from the state they find.
+
+A room's timeout filler and viewer names come from the language the room was
+created in (`settings['lang']`). Superseded heap entries are skipped
+lazily. On start the heap is seeded from the rooms already stored.
+"""
+import heapq
+import logging
+import threading
+import time
+
+from satya import engine, i18n, metrics, store
+
+RECHECK_SECONDS = 2
+
+log = logging.getLogger(__name__)
+
+_heap = []       # (deadline, game_id), possibly with superseded entries
+_deadlines = {}  # game_id -> its current deadline
+_cond = threading.Condition()
+_stats = {"advanced": 0, "deferred": 0, "failed": 0, "last_advance_at": None}
+_started = False
+_start_lock = threading.Lock()
+
+
+def schedule(game_id, deadline):
+    """Sets (or with None clears) the time at which the room should be advanced."""
+    with _cond:
+        if deadline is None:
+            _deadlines.pop(game_id, None)
+            return
+        if _deadlines.get(game_id) == deadline: return
+        _deadlines[game_id] = deadline
+        heapq.heappush(_heap, (deadline, game_id))
+        if _heap[0] == (deadline, game_id): _cond.notify()
+
+
+def note_state(state):
+    """Commit listener: reschedules the room from its latest state."""
+    schedule(state['id'], engine.transition_deadline(state))
+
+
+def _advance_step(now, phase):
+    def step(state):
+        if state['phase'] != phase: return state, []
+        lang = state.get('settings', {}).get('lang', i18n.DEFAULT_LANG)
+        return engine.advance(state, now, i18n.translate(lang, 'time_up'), lambda uid: i18n.viewer_name(uid, lang))
+    return step
+
+
+def advance_room(game_id, now=None):
+    """Performs the room's due transition if this process wins its lease; returns the room's state."""
+    now = time.time() if now is None else now
+    state = store.load_game_state(game_id)
+    if state is not None and engine.transition_due(state, now):
+        if not store.claim_transition(game_id, state['phase'], now):
+            _stats["deferred"] += 1
+            schedule(game_id, now + RECHECK_SECONDS)  # another process is on it
+            return state
+        version = state.get('version', 0)
+        state = store.record_events(game_id, _advance_step(now, state['phase']))
+        if state is not None and state.get('version', 0) != version: _stats["advanced"] += 1
+    if state is None:
+        schedule(game_id, None)
+        return None
+    note_state(state)
+    return state
+
+
+def _pop_due():
+    """Waits for the earliest deadline to pass and returns the rooms due by then."""
+    with _cond:
+        while True:
+            while _heap and _deadlines.get(_heap[0][1]) != _heap[0][0]:
+                heapq.heappop(_heap)
+            now = time.time()
+            if _heap and _heap[0][0] <= now: break
+            _cond.wait(_heap[0][0] - now if _heap else None)
+        due = []
+        while _heap and _heap[0][0] <= now:
+            deadline, game_id = heapq.heappop(_heap)
+            if _deadlines.get(game_id) == deadline:
+                del _deadlines[game_id]
+                due.append(game_id)
+        return due
+
+
+def _run():
+    while True:
+        for game_id in _pop_due():
+            try:
+                advance_room(game_id)
+                _stats["last_advance_at"] = time.time()
+            except Exception:  # one broken room must not stop the others
+                _stats["failed"] += 1
+                log.exception("advancing room %s failed", game_id)
+                schedule(game_id, time.time() + RECHECK_SECONDS)  # retry; pages no longer advance rooms
+
+
+def scheduler_stats():
+    with _cond:
+        return {**_stats, "pending": len(_deadlines), "heap_size": len(_heap)}
+
+
+def _collect_metrics():
+    stats = scheduler_stats()
+    for name in ("advanced", "deferred", "failed"):
+        yield (f"satya_scheduler_{name}_total", "counter", f"Scheduled transitions {name}.", (), stats[name])
+    yield ("satya_scheduler_pending_rooms", "gauge", "Rooms with a pending transition deadline.", (), stats["pending"])
+
+
+metrics.register_collector(_collect_metrics)
+
+
+def ensure_started():
+    """Hooks the scheduler into the store and starts its thread, once per process."""
+    global _started
+    with _start_lock:
+        if _started: return
+        _started = True
+        store.add_commit_listener(note_state)
+        for game_id in store.list_game_ids():
+            state = store.load_game_state(game_id, populate_cache=False)
+            if state is not None: note_state(state)
+    threading.Thread(target=_run, name="satya-scheduler", daemon=True).start()
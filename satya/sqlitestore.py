@@ -0,0 +1,311 @@
+"""SQLite room backend in WAL mode.
+
+A room's snapshot is one row in `rooms` (its phase and the rest of the document)
+plus child rows in `players` and `guesses`; its journal lives in `events` and
+its chat in `chat`. Documents are minified JSON in the compact form of
+`satya.codec`. `rooms.version` always holds the latest recorded event, so
+it doubles as the room's cache signature. Appending events and replacing a
+snapshot each happen in a single `BEGIN IMMEDIATE` transaction that first
+checks that version, and WAL lets readers keep reading the last committed state
+while a writer works. Connections are pooled and shared between threads.
+
+The all-time leaderboard is the `leaderboard` table, and `leaderboard_rooms`
+records which rooms it already counts.
+"""
+import json
+import queue
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from satya import codec
+from satya.backend import CHAT_TAIL_SIZE, ChatLog, RoomBackend, VersionConflict
+
+POOL_SIZE = 8
+BUSY_TIMEOUT_SECONDS = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rooms (
+    id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    phase TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rooms_by_phase ON rooms (phase, updated_at);
+CREATE TABLE IF NOT EXISTS players (
+    room_id TEXT NOT NULL REFERENCES rooms (id) ON DELETE CASCADE,
+    player_id TEXT NOT NULL,
+    user_id TEXT,
+    name TEXT,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (room_id, player_id)
+);
+CREATE TABLE IF NOT EXISTS guesses (
+    room_id TEXT NOT NULL REFERENCES rooms (id) ON DELETE CASCADE,
+    user_id TEXT NOT NULL,
+    guess TEXT NOT NULL,
+    PRIMARY KEY (room_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    room_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    at REAL NOT NULL,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (room_id, seq)
+);
+CREATE TABLE IF NOT EXISTS chat (
+    room_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (room_id, seq)
+);
+CREATE TABLE IF NOT EXISTS claims (
+    room_id TEXT NOT NULL,
+    token TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    at REAL NOT NULL,
+    PRIMARY KEY (room_id, token)
+);
+CREATE TABLE IF NOT EXISTS leaderboard (
+    user_id TEXT PRIMARY KEY,
+    name TEXT,
+    score INTEGER NOT NULL,
+    games INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leaderboard_by_score ON leaderboard (score DESC);
+CREATE TABLE IF NOT EXISTS leaderboard_rooms (
+    room_id TEXT PRIMARY KEY,
+    at REAL NOT NULL
+);
+"""
+
+
+class SqliteChatLog(ChatLog):
+    """Chat rows shared by every process on the database: `seq` is allocated in the insert's transaction."""
+
+    def __init__(self, game_id, backend):
+        super().__init__(game_id)
+        self.backend = backend
+        self.refresh()
+
+    def refresh(self):
+        with self.backend.connection() as conn:
+            rows = conn.execute("SELECT seq, doc FROM chat WHERE room_id = ? AND seq >= ? ORDER BY seq DESC LIMIT ?",
+                                (self.game_id, self.count, CHAT_TAIL_SIZE)).fetchall()
+        if not rows: return
+        rows.reverse()
+        if rows[0][0] != self.count:  # more new rows than the tail holds: skip to the newest ones
+            self.tail.clear()
+            self.count = rows[0][0]
+        for _, doc in rows:
+            self._loaded(json.loads(doc))
+
+    def append(self, message):
+        with self.lock:
+            if self.closed: return None
+            record = dict(message, ts=time.time())
+            with self.backend.transaction("IMMEDIATE") as conn:
+                (record['seq'],) = conn.execute("SELECT COALESCE(MAX(seq) + 1, 0) FROM chat WHERE room_id = ?",
+                                                (self.game_id,)).fetchone()
+                doc = codec.dumps(record)
+                conn.execute("INSERT INTO chat (room_id, seq, ts, doc) VALUES (?, ?, ?, ?)",
+                             (self.game_id, record['seq'], record['ts'], doc))
+            self.backend.count_io('chat_appends', len(doc.encode('utf-8')))
+            self.refresh()  # loads other processes' messages before this one, then this one
+            return record['seq']
+
+    def _read_stored(self, start, stop):
+        with self.backend.connection() as conn:
+            rows = conn.execute("SELECT doc FROM chat WHERE room_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                                (self.game_id, start, stop)).fetchall()
+        return [json.loads(doc) for (doc,) in rows]
+
+
+class SqliteBackend(RoomBackend):
+    def __init__(self, path, pool_size=POOL_SIZE):
+        super().__init__()
+        self.path = path
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrows a pooled connection (autocommit; use explicit BEGIN for transactions)."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if self._pool.qsize() < self.pool_size: self._pool.put(conn)
+            else: conn.close()
+
+    @contextmanager
+    def transaction(self, mode="DEFERRED"):
+        with self.connection() as conn:
+            conn.execute(f"BEGIN {mode}")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def prepare(self):
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def signature(self, game_id):
+        with self.connection() as conn:
+            row = conn.execute("SELECT version FROM rooms WHERE id = ?", (game_id,)).fetchone()
+        return row[0] if row else None
+
+    def read(self, game_id):
+        self.count_io('reads')
+        with self.transaction() as conn:
+            row = conn.execute("SELECT version, doc FROM rooms WHERE id = ?", (game_id,)).fetchone()
+            if row is None: return None
+            players = conn.execute("SELECT player_id, doc FROM players WHERE room_id = ? ORDER BY rowid",
+                                   (game_id,)).fetchall()
+            guesses = conn.execute("SELECT user_id, guess FROM guesses WHERE room_id = ? ORDER BY rowid",
+                                   (game_id,)).fetchall()
+            version, doc = row
+            snapshot = codec.decode_state(json.loads(doc))
+            events = conn.execute("SELECT doc FROM events WHERE room_id = ? AND seq > ? ORDER BY seq",
+                                  (game_id, snapshot.get('version', 0))).fetchall()
+        snapshot['players'] = {pid: json.loads(p) for pid, p in players}
+        snapshot['guesses'] = {uid: codec.decode_guesses(json.loads(g)) for uid, g in guesses}
+        return version, snapshot, [codec.decode_event(json.loads(e)) for (e,) in events]
+
+    def read_events(self, game_id):
+        with self.connection() as conn:
+            rows = conn.execute("SELECT doc FROM events WHERE room_id = ? ORDER BY seq", (game_id,)).fetchall()
+        return [codec.decode_event(json.loads(doc)) for (doc,) in rows]
+
+    def _check_version(self, conn, game_id, previous_version):
+        row = conn.execute("SELECT version FROM rooms WHERE id = ?", (game_id,)).fetchone()
+        current = row[0] if row else 0
+        if current != previous_version:
+            raise VersionConflict(game_id, previous_version, current)
+
+    def append_events(self, game_id, events, previous_version):
+        rows = [(game_id, e['seq'], e['at'], codec.dumps(codec.encode_event(e))) for e in events]
+        with self.transaction("IMMEDIATE") as conn:
+            self._check_version(conn, game_id, previous_version)
+            conn.executemany("INSERT INTO events (room_id, seq, at, doc) VALUES (?, ?, ?, ?)", rows)
+            conn.execute("UPDATE rooms SET version = ?, updated_at = ? WHERE id = ?",
+                         (events[-1]['seq'], time.time(), game_id))
+        self.count_io('appends', sum(len(r[3].encode('utf-8')) for r in rows))
+        return events[-1]['seq']
+
+    def write(self, state, previous_version):
+        game_id = state['id']
+        doc = codec.dumps(codec.encode_state({k: v for k, v in state.items() if k not in ('players', 'guesses')}))
+        players = [(game_id, pid, p.get('user_id'), p.get('name'), codec.dumps(p))
+                   for pid, p in state.get('players', {}).items()]
+        guesses = [(game_id, uid, codec.dumps(codec.encode_guesses(g))) for uid, g in state.get('guesses', {}).items()]
+        with self.transaction("IMMEDIATE") as conn:
+            self._check_version(conn, game_id, previous_version)
+            conn.execute(
+                "INSERT INTO rooms (id, version, phase, updated_at, doc) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET version = excluded.version, phase = excluded.phase, "
+                "updated_at = excluded.updated_at, doc = excluded.doc",
+                (game_id, state['version'], state.get('phase', ''), time.time(), doc))
+            conn.execute("DELETE FROM players WHERE room_id = ?", (game_id,))
+            conn.executemany("INSERT INTO players (room_id, player_id, user_id, name, doc) VALUES (?, ?, ?, ?, ?)", players)
+            conn.execute("DELETE FROM guesses WHERE room_id = ?", (game_id,))
+            conn.executemany("INSERT INTO guesses (room_id, user_id, guess) VALUES (?, ?, ?)", guesses)
+        self.count_io('writes', len(doc.encode('utf-8')) + sum(len(r[-1].encode('utf-8')) for r in players + guesses))
+        return state['version']
+
+    def delete(self, game_id):
+        with self.transaction("IMMEDIATE") as conn:
+            conn.execute("DELETE FROM rooms WHERE id = ?", (game_id,))
+            conn.execute("DELETE FROM events WHERE room_id = ?", (game_id,))
+            conn.execute("DELETE FROM claims WHERE room_id = ?", (game_id,))
+
+    def list_ids(self):
+        with self.connection() as conn:
+            return [game_id for (game_id,) in conn.execute("SELECT id FROM rooms")]
+
+    def last_activity(self, game_id):
+        with self.connection() as conn:
+            row = conn.execute("SELECT MAX(updated_at, COALESCE((SELECT MAX(ts) FROM chat WHERE room_id = ?), 0)) "
+                               "FROM rooms WHERE id = ?", (game_id, game_id)).fetchone()
+        return row[0] if row else None
+
+    def housekeeping(self, now):
+        with self.connection() as conn:
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def open_chat(self, game_id):
+        return SqliteChatLog(game_id, self)
+
+    def claim(self, game_id, token, owner, now, ttl):
+        with self.transaction("IMMEDIATE") as conn:
+            conn.execute("INSERT INTO claims (room_id, token, owner, at) VALUES (?, ?, ?, ?) "
+                         "ON CONFLICT (room_id, token) DO UPDATE SET owner = excluded.owner, at = excluded.at "
+                         "WHERE owner = excluded.owner OR at < ?", (game_id, token, owner, now, now - ttl))
+            (holder,) = conn.execute("SELECT owner FROM claims WHERE room_id = ? AND token = ?",
+                                     (game_id, token)).fetchone()
+        return holder == owner
+
+    def read_leaderboard(self):
+        with self.transaction() as conn:
+            rows = conn.execute("SELECT user_id, name, score, games FROM leaderboard").fetchall()
+            rooms = {room_id for (room_id,) in conn.execute("SELECT room_id FROM leaderboard_rooms")}
+        return {uid: {"name": name, "score": score, "games": games} for uid, name, score, games in rows}, rooms
+
+    def record_leaderboard(self, game_id, entries, now):
+        with self.transaction("IMMEDIATE") as conn:
+            if conn.execute("INSERT OR IGNORE INTO leaderboard_rooms (room_id, at) VALUES (?, ?)",
+                            (game_id, now)).rowcount == 0:
+                return
+            conn.executemany(
+                "INSERT INTO leaderboard (user_id, name, score, games, updated_at) VALUES (?, ?, ?, 1, ?) "
+                "ON CONFLICT (user_id) DO UPDATE SET name = COALESCE(excluded.name, name), "
+                "score = score + excluded.score, games = games + 1, updated_at = excluded.updated_at",
+                [(uid, name, pts, now) for uid, (name, pts) in entries.items()])
+        self.count_io('leaderboard_appends')
+
+    def room_bytes(self, game_id):
+        """Stored document bytes of the room, by kind (snapshot rows, journal, chat)."""
+        with self.connection() as conn:
+            (snapshot,) = conn.execute(
+                "SELECT COALESCE((SELECT LENGTH(CAST(doc AS BLOB)) FROM rooms WHERE id = ?), 0) "
+                "+ COALESCE((SELECT SUM(LENGTH(CAST(doc AS BLOB))) FROM players WHERE room_id = ?), 0) "
+                "+ COALESCE((SELECT SUM(LENGTH(CAST(guess AS BLOB))) FROM guesses WHERE room_id = ?), 0)",
+                (game_id, game_id, game_id)).fetchone()
+            (events,) = conn.execute("SELECT COALESCE(SUM(LENGTH(CAST(doc AS BLOB))), 0) FROM events WHERE room_id = ?",
+                                     (game_id,)).fetchone()
+            (chat,) = conn.execute("SELECT COALESCE(SUM(LENGTH(CAST(doc AS BLOB))), 0) FROM chat WHERE room_id = ?",
+                                   (game_id,)).fetchone()
+        return {"snapshot": snapshot, "journal": events, "chat": chat}
+
+    def delete_chat(self, game_id):
+        with self.connection() as conn:
+            conn.execute("DELETE FROM chat WHERE room_id = ?", (game_id,))
+
+    def import_events(self, game_id, events):
+        """Bulk-loads journal entries as-is; used by `satya.migrate`."""
+        with self.transaction("IMMEDIATE") as conn:
+            conn.executemany("INSERT OR IGNORE INTO events (room_id, seq, at, doc) VALUES (?, ?, ?, ?)",
+                             [(game_id, e['seq'], e.get('at', 0), codec.dumps(codec.encode_event(e))) for e in events])
+
+    def import_chat(self, game_id, records):
+        """Bulk-loads chat records as-is (keeping their seq and ts); used by `satya.migrate`."""
+        with self.transaction("IMMEDIATE") as conn:
+            conn.executemany("INSERT OR IGNORE INTO chat (room_id, seq, ts, doc) VALUES (?, ?, ?, ?)",
+                             [(game_id, r['seq'], r.get('ts', 0), codec.dumps(r)) for r in records])
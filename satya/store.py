@@ -0,0 +1,358 @@
+"""Room storage: event-sourced rooms with per-room locking and caching.
+
+A room changes only by recording events (see `satya.journal`): `record_events`
+runs an engine step (see `satya.engine`) and appends its events under the
+room's lock, so concurrent reruns in one
+room no longer drop each other's changes while different rooms never wait on
+each other. A room's `version` is the sequence number of its latest event and
+can be used as a compare-and-swap guard. A write is a small journal append; the
+full room document is only rewritten as a snapshot every
+`journal.SNAPSHOT_EVERY` events and on phase changes.
+
+Decoded rooms are kept in a process-wide LRU cache keyed on the backend's
+signature for the room (file identity, or the stored version), so an unchanged
+room costs a stat() or an indexed lookup instead of a full read and decode, and
+all sessions share the same frozen copy of it.
+
+Writes to a room are group-committed. Callers queue their step and then take the
+room's lock. Whoever gets the lock first runs every step queued so far, in
+order, and makes one journal append (one fsync or transaction) for all of
+their events. The other callers find theirs already committed. A burst of
+submits or guesses therefore costs a few durable writes instead of one per
+action. Every caller still returns only after its events are durable, and
+waits at most for the commit ahead of it plus its own.
+
+When a room enters `results` its round is added to the all-time leaderboard
+(`global_leaderboard`, see `satya.leaderboard`).
+
+Documents are persisted by a pluggable backend (see `satya.backend`), chosen
+with the SATYA_STORE environment variable: "json" (the default, one file per
+room under GAME_DIR) or "sqlite" (SQLite in WAL mode at SATYA_SQLITE_PATH).
+"""
+import os
+import socket
+import threading
+import time
+
+from satya import archive, journal, metrics
+from satya.backend import VersionConflict
+from satya.cache import LRUCache, freeze
+from satya.filestore import JsonFileBackend
+from satya.leaderboard import GlobalLeaderboard
+from satya.sqlitestore import SqliteBackend
+
+GAME_DIR = "gamerooms"
+STORE_BACKEND = os.environ.get("SATYA_STORE", "json")
+SQLITE_PATH = os.environ.get("SATYA_SQLITE_PATH", "gamerooms.sqlite3")
+STATE_CACHE_SIZE = 256
+CLAIM_TTL_SECONDS = 30
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}"
+STORAGE_SECONDS_HELP = "Backend call latency."
+GROUP_COMMIT_BUCKETS = (1, 2, 4, 8, 16, 32)
+
+_state_cache = LRUCache(STATE_CACHE_SIZE)
+_locks = {}
+_locks_guard = threading.Lock()
+_backend = None
+_backend_guard = threading.Lock()
+_leaderboard = None
+_commit_listeners = []
+_pending = {}  # game_id -> steps queued for the next group commit
+_pending_guard = threading.Lock()
+_delete_listeners = []
+
+
+def make_backend(kind=STORE_BACKEND, root=None):
+    """A new, unprepared backend of `kind` ("json" or "sqlite"), at the configured paths or under `root`."""
+    if kind == "json": return JsonFileBackend(os.path.join(root, GAME_DIR) if root else GAME_DIR)
+    if kind == "sqlite": return SqliteBackend(os.path.join(root, os.path.basename(SQLITE_PATH)) if root else SQLITE_PATH)
+    raise ValueError(f"unknown SATYA_STORE backend: {kind!r}")
+
+
+def get_backend():
+    """The process's room backend, created and prepared on first use."""
+    global _backend
+    with _backend_guard:
+        if _backend is None:
+            backend = make_backend()
+            backend.prepare()
+            _backend = backend
+        return _backend
+
+
+def use_backend(backend):
+    """Switches the process to another (already prepared) backend, e.g. for benchmarks.
+
+    Returns the previous backend (None if none was created yet).
+    """
+    global _backend
+    with _backend_guard:
+        previous, _backend = _backend, backend
+        _state_cache.clear()
+        return previous
+
+
+def global_leaderboard():
+    """The all-time leaderboard over the active backend, loaded on first use."""
+    global _leaderboard
+    backend = get_backend()
+    with _backend_guard:
+        if _leaderboard is None or _leaderboard.backend is not backend:
+            _leaderboard = GlobalLeaderboard(backend)
+        return _leaderboard
+
+
+def add_commit_listener(listener):
+    """Registers `listener(state)`, called under the room's lock after every committed change."""
+    _commit_listeners.append(listener)
+
+
+def add_delete_listener(listener):
+    """Registers `listener(game_id)`, called after a room is deleted."""
+    _delete_listeners.append(listener)
+
+
+def _committed(state):
+    for listener in _commit_listeners:
+        listener(state)
+
+
+def room_lock(game_id):
+    """Returns the re-entrant lock that serialises writers of one room."""
+    with _locks_guard:
+        lock = _locks.get(game_id)
+        if lock is None:
+            lock = _locks[game_id] = threading.RLock()
+        return lock
+
+
+def _cache_put(game_id, signature, state, snapshot_version):
+    frozen = freeze(state)
+    _state_cache.put(game_id, (signature, frozen, snapshot_version))
+    return frozen
+
+
+def _load(game_id, populate_cache=True):
+    """Returns `(state, snapshot_version)` for a room, or `(None, None)`."""
+    backend = get_backend()
+    signature = backend.signature(game_id)
+    if signature is None:
+        _state_cache.discard(game_id)
+        return None, None
+    entry = _state_cache.get(game_id, is_fresh=lambda e: e[0] == signature)
+    if entry is not None: return entry[1], entry[2]
+    with metrics.span("satya_storage_seconds", help=STORAGE_SECONDS_HELP, op="read"):
+        result = backend.read(game_id)
+    if result is None: return None, None
+    signature, snapshot, events = result
+    snapshot_version = snapshot.get('version', 0)
+    state = journal.fold(snapshot, events)
+    state.setdefault('version', snapshot_version)  # rooms saved before the journal have no version
+    if not populate_cache: return freeze(state), snapshot_version
+    return _cache_put(game_id, signature, state, snapshot_version), snapshot_version
+
+
+def load_game_state(game_id, populate_cache=True):
+    """Returns the room as a shared, read-only view (see `satya.cache.freeze`).
+
+    Background scans pass `populate_cache=False` so reading every room once does
+    not evict the rooms sessions are actually playing in.
+    """
+    if not game_id: return None
+    return _load(game_id, populate_cache)[0]
+
+
+def cache_stats():
+    """Hit/miss/eviction counters of the parsed-state cache."""
+    return _state_cache.stats()
+
+
+def create_game_state(state):
+    """Stores a new room: its `created` event plus a first snapshot. Returns the stored view."""
+    game_id = state['id']
+    with room_lock(game_id):
+        backend = get_backend()
+        existing = backend.signature(game_id)
+        if existing is not None:
+            raise VersionConflict(game_id, 0, existing)
+        created = dict(journal.event(journal.CREATED, state=state), seq=1, at=time.time())
+        backend.append_events(game_id, [created], 0)
+        state = journal.apply_event(None, created)
+        signature = backend.write(state, 0)
+        frozen = _cache_put(game_id, signature, state, state['version'])
+        _committed(frozen)
+        return frozen
+
+
+class _Write:
+    """One queued `record_events` call and, once committed, its outcome."""
+    __slots__ = ("step", "expected_version", "done", "result", "error")
+
+    def __init__(self, step, expected_version):
+        self.step, self.expected_version = step, expected_version
+        self.done, self.result, self.error = False, None, None
+
+
+def record_events(game_id, step, expected_version=None):
+    """Runs one engine step on a room and records its events, under the room's lock.
+
+    `step` receives the current (read-only) state and returns `(new_state,
+    events)` like the actions in `satya.engine`; no events means there is
+    nothing to record (e.g. the action is no longer valid). With
+    `expected_version` the room must still be at that version, otherwise
+    `VersionConflict` is raised. Returns the resulting state, or None if the room
+    does not exist. Steps queued by concurrent callers may be committed together
+    with this one (see the module docstring); the result then includes theirs.
+    """
+    write = _Write(step, expected_version)
+    with _pending_guard:
+        _pending.setdefault(game_id, []).append(write)
+    with room_lock(game_id):
+        if not write.done:
+            with _pending_guard:
+                batch = _pending.pop(game_id, [])
+            _commit_batch(game_id, batch)
+    if write.error is not None: raise write.error
+    return write.result
+
+
+def _run_steps(game_id, batch):
+    """Runs the steps on the room's latest state; returns `(loaded, snapshot_version, state, committed, events)`."""
+    loaded, snapshot_version = _load(game_id)
+    state, committed, events = loaded, [], []
+    if loaded is None: return loaded, snapshot_version, state, committed, events
+    for write in batch:
+        version = state.get('version', 0)
+        if write.expected_version is not None and write.expected_version != version:
+            write.error = VersionConflict(game_id, write.expected_version, version)
+            continue
+        try:
+            new_state, new_events = write.step(state)
+        except Exception as e:  # fails this caller only
+            write.error = e
+            continue
+        if not new_events: continue
+        if new_events[0]['seq'] != version + 1:
+            write.error = VersionConflict(game_id, version, new_events[0]['seq'] - 1)
+            continue
+        state = new_state
+        events.extend(new_events)
+        committed.append(write)
+    return loaded, snapshot_version, state, committed, events
+
+
+def _commit_batch(game_id, batch):
+    """Runs the queued steps in order and makes their events durable with one append. Holds the room's lock.
+
+    If another process appended to the room in between, the append conflicts;
+    the room is then reloaded and the steps that did not ask for a particular
+    version run once more on it.
+    """
+    pending = batch
+    try:
+        for attempt in (1, 2):
+            loaded, snapshot_version, state, committed, events = _run_steps(game_id, pending)
+            if loaded is None: return
+            if not events: break
+            appended = False
+            try:
+                signature = _append(game_id, events)
+                appended = True
+                state = _commit_events(game_id, state, events, snapshot_version, signature)
+                break
+            except Exception as e:
+                state = loaded
+                retry = attempt == 1 and not appended and isinstance(e, VersionConflict)
+                for write in committed:
+                    if not retry or write.expected_version is not None: write.error = e
+                if not retry: break
+                _state_cache.discard(game_id)
+                pending = [write for write in pending if write.error is None]
+        for write in batch: write.result = state
+        metrics.observe("satya_group_commit_steps", len(batch), GROUP_COMMIT_BUCKETS,
+                        help="Steps committed together per room write.")
+    except Exception as e:
+        for write in batch:
+            if write.error is None: write.error = e
+    finally:
+        for write in batch: write.done = True
+
+
+def _append(game_id, events):
+    """Appends the events to the room's journal; VersionConflict if another process appended first."""
+    with metrics.span("satya_storage_seconds", help=STORAGE_SECONDS_HELP, op="append"):
+        return get_backend().append_events(game_id, events, events[0]['seq'] - 1)
+
+
+def _commit_events(game_id, state, events, snapshot_version, signature):
+    """Finishes a commit whose events are appended: snapshot, metrics, cache and listeners."""
+    backend = get_backend()
+    phase_changed = any(e['type'] in (journal.ADVANCED, journal.ENDED) for e in events)
+    if phase_changed or state['version'] - snapshot_version >= journal.SNAPSHOT_EVERY:
+        with metrics.span("satya_storage_seconds", help=STORAGE_SECONDS_HELP, op="snapshot"):
+            signature = backend.write(state, state['version'])
+        snapshot_version = state['version']
+    for e in events:
+        metrics.inc("satya_events_total", help="Journal events committed.", type=e['type'])
+    if phase_changed and state['phase'] == 'results':
+        global_leaderboard().record_round(state)
+    frozen = _cache_put(game_id, signature, state, snapshot_version)
+    _committed(frozen)
+    return frozen
+
+
+def claim_transition(game_id, token, now=None):
+    """Takes the cross-process lease for one room transition; True if this process should perform it.
+
+    `token` names the transition (the phase being left), so each transition
+    is performed by exactly one process even when several share the backend.
+    A lease whose holder died lapses after CLAIM_TTL_SECONDS.
+    """
+    now = time.time() if now is None else now
+    return get_backend().claim(game_id, token, PROCESS_ID, now, CLAIM_TTL_SECONDS)
+
+
+def game_journal(game_id):
+    """Every event recorded for a room, oldest first (the audit trail), including archived rooms."""
+    events = get_backend().read_events(game_id)
+    return events if events else archive.load_archived_journal(game_id) or []
+
+
+def list_game_ids():
+    return get_backend().list_ids()
+
+
+def room_exists(game_id):
+    return get_backend().signature(game_id) is not None
+
+
+def last_activity(game_id):
+    """Unix time of the room's last state or chat write, or None if it does not exist."""
+    return get_backend().last_activity(game_id)
+
+
+def delete_game_state(game_id):
+    """Removes a room and forgets it in the cache and lock table."""
+    with room_lock(game_id):
+        get_backend().delete(game_id)
+        _state_cache.discard(game_id)
+    with _locks_guard:
+        _locks.pop(game_id, None)
+    for listener in _delete_listeners:
+        listener(game_id)
+
+
+def _collect_metrics():
+    cache = _state_cache.stats()
+    for name in ("hits", "misses", "evictions"):
+        yield (f"satya_state_cache_{name}_total", "counter", f"Parsed-room cache {name}.", (), cache[name])
+    yield ("satya_state_cache_size", "gauge", "Rooms held in the parsed-room cache.", (), cache["size"])
+    if _backend is not None:
+        for op, n in sorted(_backend.io.items()):
+            if op == "bytes_written":
+                yield ("satya_storage_bytes_written_total", "counter", "Bytes written by the backend.", (), n)
+            else:
+                yield ("satya_storage_ops_total", "counter", "Backend operations by kind.", (("op", op),), n)
+
+
+metrics.register_collector(_collect_metrics)
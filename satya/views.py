@@ -0,0 +1,65 @@
+"""Render models and public room projections shared by every session showing the same room.
+
+Some views depend only on the room's version and the session language, e.g. the
+results page once a room is finished. Such a view is built once into a tuple
+of `(element, *args)` steps, where an element is a Streamlit call such as
+"markdown" or "subheader", and "expander" nests a further tuple of steps. It is
+kept per (view, room, language) until the room's version changes, so every
+later rerun only emits the steps.
+
+Viewers get `public_state`, a redacted projection of the room that is built
+once per room version and shared read-only by all of them. Until `results` it
+leaves out the true varnas, the guesses themselves (a player's guesses name
+their own varna) and the sentences still being written. Player user IDs, which
+would let anyone act as that player through `?uid=`, are replaced by the
+player's slot throughout.
+"""
+from satya.cache import LRUCache, freeze
+
+VIEW_CACHE_SIZE = 512
+REVEALED_PHASES = ("results",)
+SENTENCES_VISIBLE_PHASES = ("guessing", "results")
+
+_views = LRUCache(VIEW_CACHE_SIZE)
+_public = LRUCache(VIEW_CACHE_SIZE)
+
+
+def cached_view(name, state, lang, build):
+    """The steps of view `name` for this room version and language, calling `build()` on a miss."""
+    version = state.get('version')
+    key = (name, state['id'], lang)
+    entry = _views.get(key, is_fresh=lambda e: e[0] == version)
+    if entry is None:
+        entry = (version, tuple(build()))
+        _views.put(key, entry)
+    return entry[1]
+
+
+def view_cache_stats():
+    return _views.stats()
+
+
+def _redact(state):
+    slots = dict(state['player_user_ids'])
+    revealed = state['phase'] in REVEALED_PHASES
+    show_sentences = state['phase'] in SENTENCES_VISIBLE_PHASES
+    hidden = ('players', 'player_user_ids', 'host_user_id', 'true_varna_map', 'guesses', 'guess_points', 'disqualified')
+    public = {k: v for k, v in state.items() if k not in hidden}
+    public['players'] = {pid: {**{k: v for k, v in p.items() if k != 'sentences' or show_sentences}, 'user_id': pid}
+                         for pid, p in state['players'].items()}
+    public['player_user_ids'] = {pid: pid for pid in state['players']}
+    public['host_user_id'] = slots.get(state.get('host_user_id'))
+    public['true_varna_map'] = state['true_varna_map'] if revealed else {}
+    public['guesses'] = {slots.get(uid, uid): g if revealed else True for uid, g in state.get('guesses', {}).items()}
+    public['disqualified'] = [slots.get(uid, uid) for uid in state.get('disqualified', [])]
+    return public
+
+
+def public_state(state):
+    """The viewers' redacted projection of `state`, shared by all of them until the room's version changes."""
+    version = state.get('version')
+    entry = _public.get(state['id'], is_fresh=lambda e: e[0] == version)
+    if entry is None:
+        entry = (version, freeze(_redact(state)))
+        _public.put(state['id'], entry)
+    return entry[1]
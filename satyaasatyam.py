@@ -1,201 +1,16 @@
 import streamlit as st
-import random
-import json
-import os
 import uuid
 import time
 
+from satya import archive, chat, countdown, engine, i18n, leaderboard, lobby, metrics, reaper, scheduler, views
+from satya.engine import GUESSING_TIME_LIMIT, MAX_POINTS, VARNA_KEYS, WRITING_TIME_LIMIT
+from satya.store import global_leaderboard, load_game_state, record_events
+
 # --- 1. CONFIGURATION & CONSTANTS ---
-GAME_DIR = "gamerooms"
 BASE_URL = "https://satyaasatyam.streamlit.app"
-AUTO_REFRESH_SECONDS = 15
-WRITING_TIME_LIMIT = 360  # 6 minutes
-GUESSING_TIME_LIMIT = 120 # 2 minutes
-MAX_POINTS = 12
-
-# --- 2. LANGUAGE & CONTENT ---
-def to_devanagari(num_str):
-    """Safely converts numbers to Devanagari, ignoring minus signs and other chars."""
-    s = str(num_str)
-    res = ""
-    for char in s:
-        if char.isdigit():
-            res += "०१२३४५६७८९"[int(char)]
-        else:
-            res += char
-    return res
-
-VARNA_DETAILS = {
-    "Brahmin": {"sa": {"name": "ब्राह्मणः"}, "en": {"name": "Brahmin"}},
-    "Kshatriya": {"sa": {"name": "क्षत्रियः"}, "en": {"name": "Kshatriya"}},
-    "Vaishya": {"sa": {"name": "वैश्यः"}, "en": {"name": "Vaishya"}},
-    "Shudra": {"sa": {"name": "शूद्रः"}, "en": {"name": "Shudra"}},
-}
-VARNA_KEYS = list(VARNA_DETAILS.keys())
-
-SENTENCE_PROMPTS = {
-    "Brahmin": ["truth_1", "truth_2", "truth_3"],
-    "Kshatriya": ["truth_1", "truth_2", "false_3"],
-    "Vaishya": ["truth_1", "false_2", "false_3"],
-    "Shudra": ["false_1", "false_2", "false_3"]
-}
-
-SENTENCE_MARKS = {
-    "Brahmin": ["✅", "✅", "✅"],
-    "Kshatriya": ["✅", "✅", "❌"],
-    "Vaishya": ["✅", "❌", "❌"],
-    "Shudra": ["❌", "❌", "❌"]
-}
-
-TRANSLATIONS = {
-    "sa": {
-        "lang_select": "भाषा",
-        "game_title": "सत्यासत्यम्",
-        "welcome_intro": "सुस्वागतम्। इयं चतुर्णां क्रीडकानां सत्यासत्यपरीक्षा क्रीडा॥ अत्र एको ब्राह्मणः सर्वसत्यवादी क्षत्रिय एकानृतवादी वैश्य एकसत्यवादी शूद्रश्च सर्वानृतवादी भविष्यति। सर्वेषां वर्णानां सम्यगनुमानमेव तव लक्ष्यम्॥",
-        "how_to_play": "क्रीडाविधिः",
-        "how_to_play_text": "१। चत्वारः क्रीडकाः स्वनाम दत्त्वा प्रविशन्ति।\n\n२। प्रत्येकं क्रीडकः एकं वर्णं प्राप्नोति।\n\n३। स्ववर्णस्य नियमानुसारं स्वविषये त्रीणि वाक्यानि लिख। ब्राह्मणः त्रीणि सत्यानि। क्षत्रियः द्वे सत्ये एकम् असत्यम्। वैश्यः एकं सत्यं द्वे असत्ये। शूद्रः त्रीणि असत्यानि।\n\n४। अन्येषां वाक्यानि पठित्वा तेषां यथार्थवर्णं चिनु।\n\n५। सम्यगनुमानात् ४ अङ्काः प्राप्यन्ते। अशुद्धानुमानात् १ अङ्कः न्यूनीभवति। वर्णो न चितः चेत् ० अङ्काः। पूर्णाङ्काः १२ इतिप्राप्ते 🏆 प्राप्यते।",
-        "create_game_button": "✨ नवीनं क्रीडासत्रं रचय",
-        "require_names": "नामकरणम् अनिवार्यम्",
-        "enter_name_label": "तव नामाङ्कनं कुरु",
-        "error_name_required": "अनिवार्यत्वात् कृपया स्वनाम लिख।",
-        "error_name_taken": "इदं नाम पूर्वमेव स्वीकृतम्। अन्यत् चिनु।",
-        "join_as": "इति प्रविश",
-        "player": "क्रीडकः",
-        "waiting_for_players": "अन्येषाम् आगमनं प्रतीक्षस्व",
-        "truth_1": "प्रथमं सत्यं वाक्यम्", "truth_2": "द्वितीयं सत्यं वाक्यम्", "truth_3": "तृतीयं सत्यं वाक्यम्",
-        "false_1": "प्रथमम् असत्यं वाक्यम्", "false_2": "द्वितीयम् असत्यं वाक्यम्", "false_3": "तृतीयम् असत्यं वाक्यम्",
-        "submit_sentences": "वाक्यानि समर्पय",
-        "error_all_sentences": "कृपया त्रीणि वाक्यानि लिख।",
-        "submission_success": "✅ तव वाक्यानि समर्पितानि। इतरेषां प्रतीक्षां कुरु।",
-        "time_left": "⏳ अवशिष्टः समयः",
-        "time_up": "समयः समाप्तः",
-        "guessing_time": "🤔 अनुमानपर्व",
-        "guessing_instructions": "प्रत्येकस्य क्रीडकस्य यथार्थं वर्णं योजय।",
-        "clear_hint": "--- न चितम् --- इति चिनु। ऋणात्मकाङ्केभ्यो रक्षणाय।",
-        "player_sentences": "वाक्यानि",
-        "your_guesses": "तव अनुमानानि",
-        "submit_guess": "अनुमानं निश्चिनु",
-        "error_unique_guesses": "एकमेव वर्णं द्वयोः क्रीडकयोः दातुं न शक्यते। भिन्नवर्णान् चिनु।",
-        "guess_submitted": "✅ तवानुमानं समर्पितम्। परिणामान् प्रतीक्षस्व।",
-        "status_submitted": "✅ समर्पितम्",
-        "status_writing": "⏳ लिखति",
-        "status_guessing": "⏳ चिन्तयति",
-        "reveal_results": "सर्वेषां परिणामान् प्रकाशय",
-        "results_are_in": "✨ परिणामाः आगताः ✨",
-        "true_varnas": "यथार्थवर्णाः",
-        "sentences_review": "वाक्यानां समीक्षा",
-        "guesses_review": "अनुमानानां समीक्षा",
-        "timeout_guess": "समयसमाप्तेः कारणात् अनुमानं न कृतम्।",
-        "skipped_guess": "न चितम्",
-        "true_is": "यथार्थम् {varna}।",
-        "scoring": "🏆 अङ्कगणना",
-        "round_scores": "अस्मिन् चक्रे प्राप्ताङ्काः",
-        "leaderboard": "अङ्कतालिका",
-        "points": "अङ्काः",
-        "game_links_expander": "🔗 क्रीडासूत्रं दर्शय",
-        "player_link_info": "क्रीडकेभ्यः सूत्रम्",
-        "viewer_link_info": "दर्शकेभ्यः सूत्रम्",
-        "game_room_not_found": "क्रीडासत्रं न लब्धम्।",
-        "go_to_main_menu": "मुख्यपृष्ठं गच्छ",
-        "end_game": "क्रीडां समापय",
-        "quit_game": "क्रीडां त्यज",
-        "confirm_quit_game": "अपि निश्चयेन त्यक्तुमिच्छसि।",
-        "confirm_end_game": "अपि निश्चयेन सर्वेषां कृते सत्रं समापयितुमिच्छसि।",
-        "yes": "आम्",
-        "game_ended_by_host": "आतिथेयेन क्रीडा समाप्ता॥",
-        "viewer": "दर्शकः",
-        "live_chat": "💬 सम्भाषणस्थलम्",
-        "type_message": "सन्देशं लिख",
-        "send": "प्रेषय"
-    },
-    "en": {
-        "lang_select": "Language",
-        "game_title": "Satyasatyam",
-        "welcome_intro": "Welcome. This is a 4-player game of truth and untruth. One player will be the all-truthful Brahmin, one the 1-lie Kshatriya, one the 1-truth Vaishya, and one the all-lie Shudra. Guessing everyone's identity is your goal.",
-        "how_to_play": "How to Play",
-        "how_to_play_text": "1. Four players join the game by entering their names.\n\n2. Each player is secretly assigned a Varna.\n\n3. Write 3 sentences about yourself based on your rule. (Brahmin = 3 Truths. Kshatriya = 2 Truths, 1 Lie. Vaishya = 1 Truth, 2 Lies. Shudra = 3 Lies.)\n\n4. Read others' sentences and guess their true Varna.\n\n5. Get +4 points for a correct guess, and -1 point for a wrong guess. Leave blank to pass (0 points). Score a perfect 12 to earn a 🏆!",
-        "create_game_button": "✨ Create a New Game Session",
-        "require_names": "Require names",
-        "enter_name_label": "Enter your name",
-        "error_name_required": "A name is required to join this game.",
-        "error_name_taken": "This name is already taken. Please choose another.",
-        "join_as": "Join as",
-        "player": "Player",
-        "waiting_for_players": "Waiting for other players to join",
-        "truth_1": "First True Sentence", "truth_2": "Second True Sentence", "truth_3": "Third True Sentence",
-        "false_1": "First False Sentence", "false_2": "Second False Sentence", "false_3": "Third False Sentence",
-        "submit_sentences": "Submit Sentences",
-        "error_all_sentences": "Please write three sentences.",
-        "submission_success": "✅ Your sentences are submitted. Waiting for others.",
-        "time_left": "⏳ Time left",
-        "time_up": "Time Up",
-        "guessing_time": "🤔 Guessing Time",
-        "guessing_instructions": "Match each player to their correct Varna.",
-        "clear_hint": "Tip: Select '--- Skip/Pass ---' if you don't want to guess to avoid negative points.",
-        "player_sentences": "Sentences",
-        "your_guesses": "Your Guesses",
-        "submit_guess": "Confirm Guess",
-        "error_unique_guesses": "You cannot assign the same Varna to multiple players. Select unique Varnas.",
-        "guess_submitted": "✅ Your guess is submitted! Waiting for the results.",
-        "status_submitted": "✅ Submitted",
-        "status_writing": "⏳ Writing",
-        "status_guessing": "⏳ Thinking",
-        "reveal_results": "Reveal Results for Everyone",
-        "results_are_in": "✨ The results are in! ✨",
-        "true_varnas": "The True Varnas",
-        "sentences_review": "Sentences Review",
-        "guesses_review": "Guesses Review",
-        "timeout_guess": "Did not guess (Timeout)",
-        "skipped_guess": "Skipped",
-        "true_is": "(True: {varna})",
-        "scoring": "🏆 Scoring",
-        "round_scores": "Scores This Round",
-        "leaderboard": "Leaderboard",
-        "points": "points",
-        "game_links_expander": "🔗 Show Game Links",
-        "player_link_info": "Player Link",
-        "viewer_link_info": "Viewer Link",
-        "game_room_not_found": "Game session not found.",
-        "go_to_main_menu": "Go to Main Menu",
-        "end_game": "End Game",
-        "quit_game": "Quit Game",
-        "confirm_quit_game": "Are you sure you want to quit?",
-        "confirm_end_game": "Are you sure? This will end the session for everyone.",
-        "yes": "Yes",
-        "game_ended_by_host": "The game was ended by the host.",
-        "viewer": "Viewer",
-        "live_chat": "💬 Live Chat",
-        "type_message": "Type a message",
-        "send": "Send"
-    }
-}
-
-# --- 3. GAME LOGIC & STATE MANAGEMENT ---
-def get_game_filepath(game_id):
-    return os.path.join(GAME_DIR, f"{game_id}.json")
-
-def get_initial_state(game_id, settings, host_user_id):
-    shuffled_varnas = random.sample(VARNA_KEYS, len(VARNA_KEYS))
-    return {
-        "id": game_id, "phase": "joining", "settings": settings,
-        "players": {}, "player_user_ids": {}, "host_user_id": host_user_id,
-        "true_varna_map": {f"player_{i+1}": varna for i, varna in enumerate(shuffled_varnas)},
-        "guesses": {}, "scores": {}, "last_round_scores": {}, "chat": [], "disqualified": []
-    }
-
-def load_game_state(game_id):
-    if not game_id: return None
-    filepath = get_game_filepath(game_id)
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f: return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError): return None
-
-def save_game_state(state):
-    if not state: return
-    os.makedirs(GAME_DIR, exist_ok=True)
-    with open(get_game_filepath(state['id']), 'w', encoding='utf-8') as f:
-        json.dump(state, f, indent=2, ensure_ascii=False)
+POLL_SECONDS = 15  # the original auto-refresh cadence; the countdown ticks in the browser
 
+# --- 2. GAME LOGIC & STATE MANAGEMENT ---
 def manage_session():
     url_uid = st.query_params.get("uid")
     if url_uid:
@@ -208,39 +23,36 @@ def manage_session():
     game_id = st.query_params.get("id")
     is_viewer = st.query_params.get("role") == "viewer"
     
-    state = load_game_state(game_id)
-    if state and user_id in state['player_user_ids']:
-        st.session_state['player_id'] = state['player_user_ids'][user_id]
+    seated_as = lobby.seat(user_id, game_id)
+    if seated_as: st.session_state['player_id'] = seated_as
         
     player_id = st.session_state.get('player_id')
     return user_id, player_id, game_id, is_viewer
 
 def t(key, **kwargs):
-    lang = st.session_state.get('lang', 'sa')
-    text = TRANSLATIONS.get(lang, {}).get(key) or TRANSLATIONS.get('en', {}).get(key, key)
-    return text.format(**kwargs)
+    return i18n.translate(st.session_state.get('lang', i18n.DEFAULT_LANG), key, **kwargs)
+
+def numerals(value):
+    """`value` in the session language's numerals."""
+    return i18n.numerals(value, st.session_state.get('lang', i18n.DEFAULT_LANG))
+
+def list_number(value):
+    """A list item's number in the session language: "2." or "२।"."""
+    return i18n.list_number(value, st.session_state.get('lang', i18n.DEFAULT_LANG))
 
 def format_player_name(p_id, p_data, state):
-    num = p_id.split('_')[1]
-    is_sa = st.session_state.get('lang') == 'sa'
-    num_str = f"{to_devanagari(num)}।" if is_sa else f"{num}."
-    host_str = " 👑" if p_data.get('user_id') == state.get('host_user_id') else ""
-    return f"{num_str} {p_data['name']}{host_str}"
+    return i18n.player_label(p_id, p_data, state.get('host_user_id'), st.session_state.get('lang'))
 
 def get_player_number_str(p_id):
-    if not p_id: return "V"
-    num = p_id.split('_')[1]
-    return to_devanagari(num) if st.session_state.get('lang') == 'sa' else num
-
-def get_formatted_timer(remaining_seconds):
-    """Formats the countdown timer safely without English brackets."""
-    mins, secs = remaining_seconds // 60, remaining_seconds % 60
-    if st.session_state.lang == 'sa':
-        return f"॥{to_devanagari(mins)}।{to_devanagari(f'{secs:02d}')}॥"
-    else:
-        return f"{mins}:{secs:02d}"
+    return i18n.player_number(p_id, st.session_state.get('lang'))
+
+def varna_label(varna_key):
+    return i18n.varna_name(varna_key, st.session_state.get('lang', i18n.DEFAULT_LANG))
 
-# --- 4. UI COMPONENTS ---
+def viewer_name(uid):
+    return i18n.viewer_name(uid, st.session_state.get('lang', i18n.DEFAULT_LANG))
+
+# --- 3. UI COMPONENTS ---
 def display_how_to_play():
     with st.expander(t('how_to_play')):
         st.markdown(t('how_to_play_text'))
@@ -251,7 +63,7 @@ def display_player_header(state, player_id):
         formatted_name = format_player_name(player_id, p_data, state)
         varna = state['true_varna_map'].get(player_id)
         if state['phase'] in ['writing', 'guessing'] and varna:
-            varna_name = VARNA_DETAILS[varna][st.session_state.lang]['name']
+            varna_name = varna_label(varna)
             st.info(f"👤 **{formatted_name}** | 🎭 **{varna_name}**")
         else:
             st.info(f"👤 **{formatted_name}**")
@@ -263,7 +75,7 @@ def display_joining_phase(state, user_id):
     
     player_id_to_join = st.session_state.get('player_id') or available_slots[0]
     player_num = player_id_to_join.split('_')[1]
-    player_num_str = to_devanagari(player_num) if st.session_state.lang == 'sa' else player_num
+    player_num_str = numerals(player_num)
     default_name = f"{t('player')} {player_num_str}"
 
     player_name = st.text_input(t('enter_name_label'), placeholder=default_name)
@@ -276,11 +88,9 @@ def display_joining_phase(state, user_id):
         elif name_to_save in existing_names: st.error(t('error_name_taken'))
         else:
             if not name_to_save: name_to_save = default_name
-            state['players'][player_id_to_join] = {"name": name_to_save, "user_id": user_id}
-            state['player_user_ids'][user_id] = player_id_to_join
-            state['scores'].setdefault(name_to_save, 0)
-            st.session_state['player_id'] = player_id_to_join
-            save_game_state(state)
+            new_state = record_events(state['id'], lambda s: engine.join(s, user_id, player_id_to_join, name_to_save, time.time()))
+            if new_state and new_state['player_user_ids'].get(user_id) == player_id_to_join:
+                st.session_state['player_id'] = player_id_to_join
             st.rerun()
 
 def display_status_list(state, phase):
@@ -293,32 +103,44 @@ def display_status_list(state, phase):
             status = t('status_submitted') if pdata['user_id'] in state.get('guesses', {}) else t('status_guessing')
         st.write(f"**{formatted_name}**: {status}")
 
+def display_countdown(start_time, limit):
+    """The phase countdown; it ticks in the browser, so the page does not rerun for it."""
+    remaining = max(0, limit - (time.time() - start_time))
+    st.iframe(countdown.countdown_html(remaining, st.session_state.lang, t('time_left')),
+              height=countdown.COUNTDOWN_HEIGHT)
+
+@st.fragment(run_every=POLL_SECONDS)
+def room_panel(game_id, seen, user_id, player_id, public):
+    """The status list and the chat, refreshed together from the cached room in one poll.
+
+    `seen` is the phase and players the page was rendered for; the whole page
+    reruns when either changes. Submissions, guesses and chat messages by others
+    only re-render this panel, and sending a message shows it at once.
+    """
+    metrics.inc("satya_fragment_reruns_total", help="Fragment reruns by fragment.", fragment="room_panel")
+    metrics.touch_session(f"{game_id}:{user_id}")
+    state = load_game_state(game_id)
+    if state is None or (state['phase'], tuple(sorted(state['players']))) != seen:
+        st.rerun()
+    if public: state = views.public_state(state)
+    if state['phase'] in ('writing', 'guessing'): display_status_list(state, state['phase'])
+    display_chat(state, user_id, player_id)
+
 def display_writing_phase(state, player_id):
     my_varna = state['true_varna_map'][player_id]
     
     with st.form("sentence_form"):
-        prompts = SENTENCE_PROMPTS[my_varna]
+        prompts = i18n.SENTENCE_PROMPTS[my_varna]
         sentences = [st.text_area(t(p), height=80) for p in prompts]
         
         if st.form_submit_button(t('submit_sentences')):
             if all(sentences):
-                state['players'][player_id]['sentences'] = sentences
-                state['players'][player_id]['submitted'] = True
-                save_game_state(state)
+                record_events(state['id'], lambda s: engine.submit(s, player_id, sentences, time.time()))
                 st.rerun()
             else: st.error(t('error_all_sentences'))
 
 def display_guessing_phase(state, user_id, player_id):
-    is_viewer = not player_id
-    my_varna = state['true_varna_map'].get(player_id) if not is_viewer else None
     players_to_guess = [pid for pid in state['players'] if pid != player_id]
-    varna_keys_to_guess = [v for v in VARNA_KEYS if v != my_varna]
-
-    guess_key = f"guesses_{state['id']}"
-    if guess_key not in st.session_state:
-        st.session_state[guess_key] = {pid: None for pid in players_to_guess}
-    temp_guesses = st.session_state[guess_key]
-
     st.header(t('guessing_time'))
     st.info(t('guessing_instructions'))
     st.caption(t('clear_hint'))
@@ -327,13 +149,27 @@ def display_guessing_phase(state, user_id, player_id):
         p_data = state['players'][p_id]
         formatted_name = format_player_name(p_id, p_data, state)
         with st.expander(f"{formatted_name} - {t('player_sentences')}", expanded=True):
-            s1, s2, s3 = (to_devanagari(i) if st.session_state.lang == 'sa' else i for i in [1, 2, 3])
-            num_format = "{num}।" if st.session_state.lang == 'sa' else "{num}."
-            st.markdown(f"{num_format.format(num=s1)} *{p_data['sentences'][0]}*\n\n{num_format.format(num=s2)} *{p_data['sentences'][1]}*\n\n{num_format.format(num=s3)} *{p_data['sentences'][2]}*")
+            st.markdown("\n\n".join(f"{list_number(i + 1)} *{sent}*" for i, sent in enumerate(p_data['sentences'][:3])))
+
+    guess_picker(state, user_id, player_id)
+
+@st.fragment
+def guess_picker(state, user_id, player_id):
+    """The guess dropdowns and submit button; changing a dropdown reruns only this fragment."""
+    metrics.inc("satya_fragment_reruns_total", help="Fragment reruns by fragment.", fragment="guess_picker")
+    is_viewer = not player_id
+    my_varna = state['true_varna_map'].get(player_id) if not is_viewer else None
+    players_to_guess = [pid for pid in state['players'] if pid != player_id]
+    varna_keys_to_guess = [v for v in VARNA_KEYS if v != my_varna]
+
+    guess_key = f"guesses_{state['id']}"
+    if guess_key not in st.session_state:
+        st.session_state[guess_key] = {pid: None for pid in players_to_guess}
+    temp_guesses = st.session_state[guess_key]
 
     st.subheader(t('your_guesses'))
     cols = st.columns(len(players_to_guess))
-    skip_text = "--- " + t('skipped_guess') + " ---" if st.session_state.lang == 'sa' else "--- Skip/Pass ---"
+    skip_text = t('skip_option')
     
     for i, pid in enumerate(players_to_guess):
         with cols[i]:
@@ -344,10 +180,10 @@ def display_guessing_phase(state, user_id, player_id):
             used_by_others = [val for p, val in temp_guesses.items() if p != pid and val is not None]
             available_keys = [k for k in varna_keys_to_guess if k not in used_by_others]
             
-            options_names = [VARNA_DETAILS[k][st.session_state.lang]['name'] for k in available_keys]
+            options_names = [varna_label(k) for k in available_keys]
             full_options = [skip_text] + options_names
             
-            curr_val_name = VARNA_DETAILS[current_selection][st.session_state.lang]['name'] if current_selection else None
+            curr_val_name = varna_label(current_selection) if current_selection else None
             idx = full_options.index(curr_val_name) if curr_val_name in full_options else 0
             
             selected_name = st.selectbox(f"**{formatted_name}**", full_options, index=idx, key=f"guess_box_{pid}")
@@ -355,8 +191,7 @@ def display_guessing_phase(state, user_id, player_id):
             if selected_name == skip_text:
                 temp_guesses[pid] = None
             else:
-                selected_key = [k for k in VARNA_KEYS if VARNA_DETAILS[k][st.session_state.lang]['name'] == selected_name][0]
-                temp_guesses[pid] = selected_key
+                temp_guesses[pid] = i18n.varna_key(selected_name, st.session_state.lang)
 
     if st.button(t('submit_guess'), type="primary"):
         made_guesses = [v for v in temp_guesses.values() if v is not None]
@@ -365,72 +200,88 @@ def display_guessing_phase(state, user_id, player_id):
         else:
             final_guesses = temp_guesses.copy()
             if not is_viewer: final_guesses[player_id] = my_varna
-            state['guesses'][user_id] = final_guesses
-            save_game_state(state)
+            record_events(state['id'], lambda s: engine.guess(s, user_id, final_guesses, time.time()))
             st.rerun()
 
-def display_results_phase(state, user_id):
-    st.header(t('results_are_in'))
-    
-    st.subheader(t('sentences_review'))
+def results_view(state):
+    """The room-wide part of the results page as render steps (see `satya.views`)."""
+    lang = st.session_state.lang
+    steps = [("header", t('results_are_in')), ("subheader", t('sentences_review'))]
     for p_id, p_data in sorted(state['players'].items()):
         formatted_name = format_player_name(p_id, p_data, state)
         varna_key = state['true_varna_map'][p_id]
-        varna_name = VARNA_DETAILS[varna_key][st.session_state.lang]['name']
-        marks = SENTENCE_MARKS[varna_key]
-        
-        st.markdown(f"**{formatted_name} | {varna_name}**")
+        varna_name = i18n.varna_name(varna_key, lang)
+        marks = i18n.SENTENCE_MARKS[varna_key]
+
+        steps.append(("markdown", f"**{formatted_name} | {varna_name}**"))
         for i, sent in enumerate(p_data['sentences']):
-            num = to_devanagari(i+1) if st.session_state.lang == 'sa' else i+1
-            num_str = f"{num}।" if st.session_state.lang == 'sa' else f"{num}."
-            st.markdown(f"{num_str} {marks[i]} *{sent}*")
-        st.markdown("---")
+            steps.append(("markdown", f"{list_number(i + 1)} {marks[i]} *{sent}*"))
+        steps.append(("markdown", "---"))
 
-    st.subheader(t('guesses_review'))
+    steps.append(("subheader", t('guesses_review')))
     for uid, guess_dict in state['guesses'].items():
         is_viewer_guess = uid not in state['player_user_ids']
         if is_viewer_guess:
-            uid_str = to_devanagari(uid[:4]) if st.session_state.lang == 'sa' else uid[:4]
-            g_name = f"{t('viewer')} {uid_str}"
+            g_name = viewer_name(uid)
         else:
             g_pid = state['player_user_ids'][uid]
             g_name = format_player_name(g_pid, state['players'][g_pid], state)
-            
-        with st.expander(f"**{g_name}** - {t('your_guesses')}", expanded=False):
-            if guess_dict == "TIMEOUT":
-                st.error(t('timeout_guess'))
-            else:
-                for target_pid, target_guess in guess_dict.items():
-                    if not is_viewer_guess and target_pid == state['player_user_ids'][uid]:
-                        continue
-                    
-                    t_name = format_player_name(target_pid, state['players'][target_pid], state)
-                    true_v_key = state['true_varna_map'][target_pid]
-                    true_v_name = VARNA_DETAILS[true_v_key][st.session_state.lang]['name']
-                    
-                    if target_guess is None:
-                        guessed_v_name = t('skipped_guess')
-                        mark = "⚪"
-                    else:
-                        guessed_v_name = VARNA_DETAILS[target_guess][st.session_state.lang]['name']
-                        mark = "✅" if target_guess == true_v_key else "❌"
-                        
-                    st.markdown(f"- **{t_name}**: {guessed_v_name} {mark} {t('true_is', varna=true_v_name)}")
-
-    st.subheader(t('round_scores'))
+
+        if guess_dict == "TIMEOUT":
+            inner = [("error", t('timeout_guess'))]
+        else:
+            inner = []
+            for target_pid, target_guess in guess_dict.items():
+                if not is_viewer_guess and target_pid == state['player_user_ids'][uid]:
+                    continue
+
+                t_name = format_player_name(target_pid, state['players'][target_pid], state)
+                true_v_key = state['true_varna_map'][target_pid]
+                true_v_name = i18n.varna_name(true_v_key, lang)
+
+                if target_guess is None:
+                    guessed_v_name = t('skipped_guess')
+                    mark = "⚪"
+                else:
+                    guessed_v_name = i18n.varna_name(target_guess, lang)
+                    mark = "✅" if target_guess == true_v_key else "❌"
+
+                inner.append(("markdown", f"- **{t_name}**: {guessed_v_name} {mark} {t('true_is', varna=true_v_name)}"))
+        steps.append(("expander", f"**{g_name}** - {t('your_guesses')}", tuple(inner)))
+
+    steps.append(("subheader", t('round_scores')))
     if not state.get('last_round_scores'):
-        st.warning(t('no_correct_guesses'))
+        steps.append(("warning", t('no_correct_guesses')))
     else:
         for name, pts in state['last_round_scores'].items():
-            pts_str = to_devanagari(pts) if st.session_state.lang == 'sa' else pts
             trophy = " 🏆" if pts == MAX_POINTS else ""
-            st.success(f"**{name}**: {pts_str} {t('points')}{trophy}")
+            steps.append(("success", f"**{name}**: {numerals(pts)} {t('points')}{trophy}"))
+
+    steps.append(("subheader", t('leaderboard')))
+    standings = leaderboard.room_standings(state)
+    for name, score in standings.top(len(standings)):
+        steps.append(("markdown", f"**{name}** : `{numerals(score)} {t('points')}`"))
+    return steps
+
+def render_steps(steps):
+    for element, *args in steps:
+        if element == "expander":
+            with st.expander(args[0], expanded=False):
+                render_steps(args[1])
+        else:
+            getattr(st, element)(*args)
 
-    st.subheader(t('leaderboard'))
-    if state.get('scores'):
-        for name, score in sorted(state['scores'].items(), key=lambda x: x[1], reverse=True):
-            score_str = to_devanagari(score) if st.session_state.lang == 'sa' else score
-            st.markdown(f"**{name}** : `{score_str} {t('points')}`")
+def display_results_phase(state, user_id):
+    render_steps(views.cached_view("results", state, st.session_state.lang, lambda: results_view(state)))
+
+    st.subheader(t('global_leaderboard'))
+    board = global_leaderboard()
+    for row in board.top():
+        score_str = numerals(row['score'])
+        st.markdown(f"**{row['name'] or viewer_name(row['user_id'])}** : `{score_str} {t('points')}`")
+    rank = board.rank(user_id)
+    if rank:
+        st.caption(t('your_rank', rank=numerals(rank)))
 
     st.markdown("---")
     if st.button(t('go_to_main_menu'), type="primary", use_container_width=True):
@@ -440,13 +291,10 @@ def display_results_phase(state, user_id):
         st.rerun()
 
 def display_chat(state, user_id, player_id):
+    """The chat panel: new messages since the last poll, and a form that sends without rerunning the page."""
     st.markdown("---")
     with st.expander(t('live_chat'), expanded=False):
         chat_box = st.container(height=250)
-        for msg in state.get('chat', []):
-            with chat_box.chat_message("user" if msg['user_id'] == user_id else "assistant"):
-                st.write(f"**{msg['sender']}**: {msg['text']}")
-                
         with st.form("chat_form", clear_on_submit=True):
             cols = st.columns([4, 1])
             prompt = cols[0].text_input(t('type_message'), label_visibility="collapsed")
@@ -454,14 +302,29 @@ def display_chat(state, user_id, player_id):
                 if prompt:
                     p_data = state.get('players', {}).get(player_id)
                     sender_name = format_player_name(player_id, p_data, state) if p_data else t('viewer')
-                    state.setdefault('chat', []).append({
+                    message = {
                         "user_id": user_id, 
                         "player_id": player_id,
                         "sender": sender_name, 
                         "text": prompt
-                    })
-                    save_game_state(state)
-                    st.rerun()
+                    }
+                    chat.post_message(state['id'], message)
+
+        # Filled after the form so a message just sent shows without another rerun.
+        view = st.session_state.setdefault(f"chat_{state['id']}", {"messages": [], "last_seq": -1, "limit": chat.CHAT_PAGE_SIZE})
+        new_messages = chat.messages_since(state['id'], view['last_seq'])
+        if new_messages:
+            if new_messages[0]['seq'] != view['last_seq'] + 1: view['messages'] = []
+            view['messages'] = (view['messages'] + new_messages)[-view['limit']:]
+            view['last_seq'] = new_messages[-1]['seq']
+
+        if view['messages'] and view['messages'][0]['seq'] > 0:
+            if chat_box.button(t('earlier_messages'), key="chat_earlier"):
+                view['messages'] = list(chat.messages_before(state['id'], view['messages'][0]['seq'])) + view['messages']
+                view['limit'] += chat.CHAT_PAGE_SIZE
+        for msg in view['messages']:
+            with chat_box.chat_message("user" if msg['user_id'] == user_id else "assistant"):
+                st.write(f"**{msg['sender']}**: {msg['text']}")
 
 def display_footer(state, user_id, player_id):
     st.markdown("---")
@@ -477,12 +340,7 @@ def display_footer(state, user_id, player_id):
             with st.popover("🚪 " + t('quit_game'), use_container_width=True):
                 st.write(t('confirm_quit_game'))
                 if st.button(t('yes'), key="quit_yes", use_container_width=True):
-                    state['players'].pop(player_id, None)
-                    state['player_user_ids'].pop(user_id, None)
-                    if state.get('host_user_id') == user_id:
-                        new_host = next((p['user_id'] for p in state['players'].values() if p.get('user_id')), None)
-                        state['host_user_id'] = new_host
-                    save_game_state(state)
+                    record_events(state['id'], lambda s: engine.quit_game(s, user_id, player_id, time.time()))
                     st.session_state.pop('player_id', None)
                     st.rerun()
     
@@ -491,33 +349,56 @@ def display_footer(state, user_id, player_id):
             with st.popover("🛑 " + t('end_game'), use_container_width=True):
                 st.write(t('confirm_end_game'))
                 if st.button(t('yes'), key="end_yes", type="primary", use_container_width=True):
-                    state['phase'] = 'ended_by_host'
-                    save_game_state(state)
+                    record_events(state['id'], lambda s: engine.end_game(s, time.time()))
                     st.rerun()
 
-# --- 5. MAIN APPLICATION ---
+# --- 4. MAIN APPLICATION ---
 def main():
     st.set_page_config(page_title="सत्यासत्यम्", layout="centered")
+    reaper.ensure_started()
+    scheduler.ensure_started()
+    lobby.ensure_started()
+    metrics.ensure_started()
     st.radio(" ", options=['sa', 'en'], format_func=lambda x: "संस्कृतम्" if x == 'sa' else "English", horizontal=True, key='lang', label_visibility="collapsed")
 
     user_id, player_id, game_id, is_viewer = manage_session()
     state = load_game_state(game_id)
+    metrics.inc("satya_reruns_total", help="Full page reruns by room phase.",
+                phase=state['phase'] if state else "menu")
     
     if not game_id:
         st.title(t('game_title'))
         st.write(t('welcome_intro'))
         display_how_to_play()
+
+        my_rooms = lobby.active_rooms(user_id)
+        if my_rooms:
+            st.subheader(t('your_games'))
+            for room in my_rooms:
+                if st.button(f"{t('rejoin')} {room['game_id']} · {t('player')} {get_player_number_str(room['player_id'])}",
+                             key=f"rejoin_{room['game_id']}"):
+                    st.query_params["id"], st.session_state.player_id = room['game_id'], room['player_id']
+                    st.rerun()
             
+        if st.button(t('quick_play_button'), type="primary"):
+            seat = lobby.quick_play(user_id, lambda pid: f"{t('player')} {numerals(pid.split('_')[1])}", st.session_state.lang)
+            if seat:
+                st.query_params["id"], st.session_state.player_id = seat
+                st.rerun()
+            st.error(t('quick_play_failed'))
+
         require_names = st.checkbox(t('require_names'), value=True)
         if st.button(t('create_game_button')):
-            new_id = str(uuid.uuid4().hex[:6].upper())
-            new_state = get_initial_state(new_id, {"require_names": require_names}, user_id)
-            save_game_state(new_state)
+            new_state = lobby.create_room({"require_names": require_names, "lang": st.session_state.lang}, user_id)
             st.session_state.player_id = "player_1"
-            st.query_params["id"] = new_id
+            st.query_params["id"] = new_state['id']
             st.rerun()
         return
 
+    archived = False
+    if not state:
+        state = archive.load_archived_state(game_id)
+        archived = state is not None
     if not state:
         st.error(t('game_room_not_found'))
         if st.button(t('go_to_main_menu')): st.query_params.clear(); st.rerun()
@@ -531,70 +412,22 @@ def main():
             st.rerun()
         return
 
+    if is_viewer and not player_id: state = views.public_state(state)
+    if archived:
+        st.caption(t('archived_game'))
+        display_results_phase(state, user_id)
+        return
+    with metrics.serving_room(game_id), \
+            metrics.span("satya_render_seconds", help="Room page render time.", phase=state['phase']):
+        display_room(state, user_id, player_id, game_id, is_viewer)
+
+def display_room(state, user_id, player_id, game_id, is_viewer):
     display_player_header(state, player_id)
-        
-    num_players = len(state['players'])
-    num_submitted = sum(1 for p in state['players'].values() if p.get('submitted'))
-    num_guessed = sum(1 for uid in state['player_user_ids'] if uid in state.get('guesses', {}))
-    current_time = time.time()
-    
-    # --- AUTO-ADVANCE & SCORING LOGIC ---
-    if state['phase'] == 'joining' and num_players == 4:
-        state['phase'] = 'writing'
-        state['writing_start_time'] = current_time
-        save_game_state(state)
-        st.rerun()
-        
-    elif state['phase'] == 'writing':
-        elapsed = current_time - state.get('writing_start_time', current_time)
-        if num_submitted == 4 or elapsed >= WRITING_TIME_LIMIT:
-            for pid, pdata in state['players'].items():
-                if not pdata.get('submitted'):
-                    pdata['sentences'] = [t('time_up')] * 3
-                    pdata['submitted'] = True
-                    state.setdefault('disqualified', []).append(pdata['user_id'])
-            state['phase'] = 'guessing'
-            state['guessing_start_time'] = current_time
-            save_game_state(state)
-            st.rerun()
-            
-    elif state['phase'] == 'guessing':
-        elapsed = current_time - state.get('guessing_start_time', current_time)
-        if num_guessed == 4 or elapsed >= GUESSING_TIME_LIMIT:
-            for uid in state['player_user_ids']:
-                if uid not in state.setdefault('guesses', {}):
-                    state['guesses'][uid] = "TIMEOUT"
-                    state.setdefault('disqualified', []).append(uid)
-            
-            truth = state['true_varna_map']
-            round_scores = {}
-            for uid, guess_dict in state['guesses'].items():
-                pts = 0
-                if uid not in state.get('disqualified', []) and isinstance(guess_dict, dict):
-                    for pid, guessed_varna in guess_dict.items():
-                        if pid != state['player_user_ids'].get(uid):
-                            if guessed_varna is None:
-                                pass # 0 points
-                            elif truth.get(pid) == guessed_varna:
-                                pts += 4
-                            else:
-                                pts -= 1  # -1 Penalty
-                            
-                g_name = state['players'].get(state['player_user_ids'].get(uid, ""), {}).get('name')
-                if not g_name:
-                    uid_str = to_devanagari(uid[:4]) if st.session_state.lang == 'sa' else uid[:4]
-                    g_name = f"{t('viewer')} {uid_str}"
-                
-                if pts != 0:
-                    round_scores[g_name] = pts
-                    state['scores'][g_name] = state['scores'].get(g_name, 0) + pts
-
-            state['last_round_scores'] = round_scores
-            state['phase'] = 'results'
-            save_game_state(state)
-            st.rerun()
-    
-    needs_refresh = False
+
+    # Phase changes and scoring are done by the background scheduler (satya.scheduler).
+    # The status list and chat refresh together in one polling fragment (room_panel),
+    # which reruns the page when the phase or the players change; the countdown
+    # ticks in the browser.
     
     # --- DISPLAY PHASES ---
     if state['phase'] == 'joining':
@@ -602,59 +435,36 @@ def main():
         if not is_viewer and (not player_id or player_id not in state['players']): 
             display_joining_phase(state, user_id)
         else: 
-            num_j = len(state['players'])
-            if st.session_state.lang == 'sa':
-                num_str = f"॥{to_devanagari(num_j)}।{to_devanagari(4)}॥"
-                st.info(f"{t('waiting_for_players')} {num_str}")
-            else:
-                num_str = f"{num_j}/4"
-                st.info(f"{t('waiting_for_players')} {num_str}")
+            player_count = t('player_count', count=numerals(len(state['players'])), total=numerals(len(engine.PLAYER_SLOTS)))
+            st.info(f"{t('waiting_for_players')} {player_count}")
             
             st.markdown("---")
             for pid, pdata in sorted(state['players'].items()):
                 formatted_name = format_player_name(pid, pdata, state)
                 st.write(f"**{formatted_name}**")
-            needs_refresh = True
             
     elif state['phase'] == 'writing':
-        elapsed = time.time() - state.get('writing_start_time', time.time())
-        remaining = max(0, WRITING_TIME_LIMIT - int(elapsed))
-        timer_str = get_formatted_timer(remaining)
-        st.warning(f"**{t('time_left')} {timer_str}**")
+        display_countdown(state.get('writing_start_time', time.time()), WRITING_TIME_LIMIT)
 
         if is_viewer or state['players'].get(player_id, {}).get('submitted'):
             st.success(t('submission_success'))
-            display_status_list(state, 'writing')
-            needs_refresh = True
         else:
             display_writing_phase(state, player_id)
-            display_status_list(state, 'writing')
-            needs_refresh = True 
 
     elif state['phase'] == 'guessing':
-        elapsed = time.time() - state.get('guessing_start_time', time.time())
-        remaining = max(0, GUESSING_TIME_LIMIT - int(elapsed))
-        timer_str = get_formatted_timer(remaining)
-        st.warning(f"**{t('time_left')} {timer_str}**")
+        display_countdown(state.get('guessing_start_time', time.time()), GUESSING_TIME_LIMIT)
 
         if user_id in state.get('guesses', {}) or is_viewer:
             st.success(t('guess_submitted'))
-            display_status_list(state, 'guessing')
-            needs_refresh = True
         else: 
             display_guessing_phase(state, user_id, player_id)
-            display_status_list(state, 'guessing')
-            needs_refresh = True
         
     elif state['phase'] == 'results':
         display_results_phase(state, user_id)
         
-    display_chat(state, user_id, player_id)
+    room_panel(game_id, (state['phase'], tuple(sorted(state['players']))), user_id, player_id,
+               is_viewer and not player_id)
     display_footer(state, user_id, player_id)
 
-    if needs_refresh:
-        time.sleep(AUTO_REFRESH_SECONDS)
-        st.rerun()
-
 if __name__ == "__main__":
     main()
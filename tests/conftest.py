@@ -0,0 +1,13 @@
+import pytest
+
+from satya import store
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request, tmp_path):
+    """A fresh backend of each kind in a temporary directory, active in `satya.store` for the test."""
+    target = store.make_backend(request.param, str(tmp_path))
+    target.prepare()
+    previous = store.use_backend(target)
+    yield target
+    store.use_backend(previous)
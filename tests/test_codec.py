@@ -0,0 +1,45 @@
+import json
+
+from satya import codec, engine, journal
+
+from test_engine import P1, P2, P3, guessing
+
+
+def round_trip_state(state):
+    return codec.decode_state(json.loads(codec.dumps(codec.encode_state(state))))
+
+
+def test_state_round_trip():
+    state = json.loads(json.dumps(guessing()))
+    state['guesses'] = {"u1": {P2: "Brahmin", P3: None}, "u2": "TIMEOUT", "v1": {}}
+    assert round_trip_state(state) == state
+
+
+def test_compact_form():
+    state = json.loads(json.dumps(guessing()))
+    encoded = codec.encode_state(dict(state, guesses={"u1": {P2: "Kshatriya", P3: None}}))
+    assert set(encoded['players']) == {1, 2, 3, 4}
+    assert encoded['player_user_ids']['u1'] == 1
+    assert encoded['true_varna_map'] == "".join(str(engine.VARNA_KEYS.index(state['true_varna_map'][pid]))
+                                                for pid in engine.PLAYER_SLOTS)
+    assert encoded['guesses'] == {"u1": ".1-."}
+
+
+def test_original_form_still_decodes():
+    state = json.loads(json.dumps(guessing()))
+    state['guesses'] = {"u1": {P1: "Shudra"}}
+    assert codec.decode_state(json.loads(json.dumps(state))) == state
+
+
+def test_event_round_trip():
+    events = [
+        journal.event(journal.CREATED, state=engine.get_initial_state("R", {"lang": "sa"}, "u1")),
+        journal.event(journal.JOINED, player_id=P2, name="नाम", user_id="u2"),
+        journal.event(journal.GUESSED, user_id="v1", guesses={P1: "Vaishya", P2: None}, points=3),
+        journal.event(journal.ADVANCED, phase="guessing", at=5.5, timed_out=[P1, P3], filler="Time Up"),
+        journal.event(journal.ADVANCED, phase="results", at=6, timed_out=["u1"], round_scores={"P2": 4}),
+    ]
+    for seq, e in enumerate(events, 1):
+        e = dict(e, seq=seq, at=e.get('at', 1.25))
+        stored = json.loads(codec.dumps(codec.encode_event(e)))
+        assert codec.decode_event(stored) == e
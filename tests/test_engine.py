@@ -0,0 +1,156 @@
+import random
+
+import pytest
+
+from satya import engine
+from satya.cache import FrozenDict, freeze, thaw
+
+P1, P2, P3, P4 = engine.PLAYER_SLOTS
+USERS = ["u1", "u2", "u3", "u4"]
+
+
+def joined(rng=None):
+    state = freeze(engine.get_initial_state("ROOM01", {"lang": "en"}, "u1", rng=rng or random.Random(1)))
+    for i, (uid, pid) in enumerate(zip(USERS, engine.PLAYER_SLOTS)):
+        state, _ = engine.join(state, uid, pid, f"P{i + 1}", now=10)
+    return state
+
+
+def writing():
+    state, _ = engine.advance(joined(), now=20)
+    return state
+
+
+def guessing():
+    state = writing()
+    for pid in engine.PLAYER_SLOTS:
+        state, _ = engine.submit(state, pid, ["a", "b", "c"], now=30)
+    state, _ = engine.advance(state, now=40)
+    return state
+
+
+def correct_guesses(state, uid):
+    own = state['player_user_ids'].get(uid)
+    return {pid: varna for pid, varna in state['true_varna_map'].items() if pid != own}
+
+
+def test_initial_state_is_seeded():
+    a = engine.get_initial_state("R", {}, "u1", rng=random.Random(7))
+    b = engine.get_initial_state("R", {}, "u1", rng=random.Random(7))
+    assert a == b
+    assert sorted(a['true_varna_map'].values()) == sorted(engine.VARNA_KEYS)
+    assert a['phase'] == 'joining'
+
+
+def test_join_stamps_events_and_indexes_the_player():
+    state = freeze(engine.get_initial_state("R", {}, "u1"))
+    new, events = engine.join(state, "u1", P1, "Asha", now=5)
+    assert [(e['type'], e['seq'], e['at']) for e in events] == [("joined", 1, 5)]
+    assert new['players'][P1] == {"name": "Asha", "user_id": "u1"}
+    assert new['player_user_ids'] == {"u1": P1}
+    assert new['version'] == 1
+    assert state['players'] == {}  # the input is never modified
+
+
+@pytest.mark.parametrize("uid, pid, name", [
+    ("u1", P2, "Other"),  # already seated
+    ("u9", P1, "Other"),  # slot taken
+    ("u9", P2, "P1"),     # name taken
+])
+def test_invalid_join_records_nothing(uid, pid, name):
+    state = freeze(engine.get_initial_state("R", {}, "u1"))
+    state, _ = engine.join(state, "u1", P1, "P1", now=1)
+    assert engine.join(state, uid, pid, name, now=2) == (state, [])
+
+
+def test_join_is_refused_after_joining():
+    state = writing()
+    assert engine.join(state, "u9", P1, "Late", now=25)[1] == []
+
+
+def test_advance_waits_for_four_players_then_starts_writing():
+    state = freeze(engine.get_initial_state("R", {}, "u1"))
+    state, _ = engine.join(state, "u1", P1, "P1", now=1)
+    assert engine.advance(state, now=1000)[1] == []
+    state = writing()
+    assert state['phase'] == 'writing' and state['writing_start_time'] == 20
+
+
+def test_submit_once_and_only_while_writing():
+    state = writing()
+    state, events = engine.submit(state, P2, ["x", "y", "z"], now=25)
+    assert events and state['players'][P2]['sentences'] == ("x", "y", "z")
+    assert engine.submit(state, P2, ["again"] * 3, now=26)[1] == []
+    assert engine.submit(joined(), P2, ["x"] * 3, now=26)[1] == []
+
+
+def test_writing_timeout_fills_in_and_disqualifies_late_players():
+    state = writing()
+    state, _ = engine.submit(state, P1, ["a", "b", "c"], now=25)
+    assert engine.advance(state, now=20 + engine.WRITING_TIME_LIMIT - 1)[1] == []
+    state, _ = engine.advance(state, now=20 + engine.WRITING_TIME_LIMIT, filler="Time Up")
+    assert state['phase'] == 'guessing'
+    assert state['players'][P2]['sentences'] == ("Time Up",) * 3
+    assert sorted(state['disqualified']) == ["u2", "u3", "u4"]
+
+
+def test_guess_points():
+    state = guessing()
+    truth = state['true_varna_map']
+    wrong = next(v for v in engine.VARNA_KEYS if v != truth[P2])
+    guesses = {P1: truth[P1], P2: wrong, P3: None, P4: "ignored: own slot"}
+    assert engine.guess_points(state, "u4", guesses, set()) == engine.CORRECT_GUESS_POINTS + engine.WRONG_GUESS_POINTS
+    assert engine.guess_points(state, "u4", guesses, {"u4"}) == 0
+    assert engine.guess_points(state, "u4", "TIMEOUT", set()) == 0
+
+
+def test_guess_once_and_only_while_guessing():
+    state = guessing()
+    state, events = engine.guess(state, "v1", correct_guesses(state, "v1"), now=50)
+    assert events[0]['points'] == engine.CORRECT_GUESS_POINTS * 4
+    assert engine.guess(state, "v1", {}, now=51)[1] == []
+    assert engine.guess(writing(), "v1", {}, now=51)[1] == []
+
+
+def test_round_is_scored_when_everyone_has_guessed():
+    state = guessing()
+    for uid in USERS:
+        assert not engine.transition_due(state, now=50)
+        state, _ = engine.guess(state, uid, correct_guesses(state, uid), now=50)
+    state, _ = engine.advance(state, now=50, name_viewer=lambda uid: uid)
+    assert state['phase'] == 'results'
+    assert dict(state['last_round_scores']) == {f"P{i}": engine.MAX_POINTS for i in range(1, 5)}
+    assert engine.round_points(state) == {uid: engine.MAX_POINTS for uid in USERS}
+
+
+def test_guessing_timeout_disqualifies_players_who_did_not_guess():
+    state = guessing()
+    state, _ = engine.guess(state, "u1", correct_guesses(state, "u1"), now=50)
+    state, _ = engine.guess(state, "v1", correct_guesses(state, "v1"), now=50)
+    state, _ = engine.advance(state, now=40 + engine.GUESSING_TIME_LIMIT, name_viewer=lambda uid: f"viewer {uid}")
+    assert state['guesses']['u2'] == "TIMEOUT"
+    assert {"u2", "u3", "u4"} <= set(state['disqualified'])
+    assert dict(state['last_round_scores']) == {"P1": engine.MAX_POINTS, "viewer v1": 4 * engine.CORRECT_GUESS_POINTS}
+
+
+def test_host_quitting_hands_over_the_room():
+    state, _ = engine.quit_game(joined(), "u1", P1, now=15)
+    assert P1 not in state['players'] and "u1" not in state['player_user_ids']
+    assert state['host_user_id'] == "u2"
+
+
+def test_end_game_once():
+    state, events = engine.end_game(joined(), now=15)
+    assert state['phase'] == 'ended_by_host' and events
+    assert engine.end_game(state, now=16)[1] == []
+
+
+def test_new_states_are_frozen_and_share_untouched_parts():
+    before = guessing()
+    after, _ = engine.guess(before, "v1", {P1: "Brahmin"}, now=50)
+    assert isinstance(after, FrozenDict) and isinstance(after['guesses'], FrozenDict)
+    assert after['players'] is before['players']
+    assert "v1" not in before['guesses']
+    with pytest.raises(TypeError):
+        after['guesses']['v2'] = {}
+    assert thaw(after)['guesses']['v1'] == {P1: "Brahmin"}
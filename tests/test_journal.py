@@ -0,0 +1,54 @@
+"""Stored, cached and replayed rooms agree for randomised games."""
+import json
+import random
+
+import pytest
+
+from satya import engine, journal, store
+from satya.cache import thaw
+
+GAMES = 200
+
+
+def plain(state):
+    return json.loads(json.dumps(thaw(state), sort_keys=True))
+
+
+def random_move(rng, state, now):
+    """One plausible move for the room's phase; some are no longer valid and record nothing."""
+    phase = state['phase']
+    if rng.random() < 0.005: return engine.end_game(state, now)
+    if phase == 'joining':
+        if rng.random() < 0.1: return engine.advance(state, now, "Time Up")
+        slots = engine.available_slots(state) or engine.PLAYER_SLOTS
+        return engine.join(state, f"u{rng.randint(0, 5)}", rng.choice(slots), f"N{rng.randint(0, 5)}", now)
+    if phase == 'writing':
+        if rng.random() < 0.15: return engine.advance(state, now + rng.choice([0, engine.WRITING_TIME_LIMIT]), "Time Up")
+        if rng.random() < 0.05: return engine.quit_game(state, "u1", state['player_user_ids'].get("u1"), now)
+        return engine.submit(state, rng.choice(engine.PLAYER_SLOTS), [f"s{rng.random():.3f}"] * 3, now)
+    if phase == 'guessing':
+        if rng.random() < 0.05: return engine.advance(state, now + rng.choice([0, engine.GUESSING_TIME_LIMIT]), "Time Up")
+        guesses = {pid: rng.choice(engine.VARNA_KEYS + [None]) for pid in rng.sample(engine.PLAYER_SLOTS, 3)}
+        uid = rng.choice(list(state['player_user_ids']) + [f"v{i}" for i in range(60)])
+        return engine.guess(state, uid, guesses, now)
+    return engine.quit_game(state, "u2", state['player_user_ids'].get("u2"), now)
+
+
+@pytest.mark.parametrize("seed", range(GAMES))
+def test_stored_cached_and_replayed_rooms_agree(seed, backend):
+    rng = random.Random(seed)
+    game_id = f"G{seed:05d}"
+    store.create_game_state(engine.get_initial_state(game_id, {"lang": "en"}, "u0", rng=rng))
+    now = 1000.0
+    for _ in range(rng.randint(10, 4 * journal.SNAPSHOT_EVERY)):
+        now += rng.uniform(0, 30)
+        store.record_events(game_id, lambda state: random_move(rng, state, now))
+
+    cached = store.load_game_state(game_id)
+    signature, snapshot, events = backend.read(game_id)
+    stored = journal.fold(snapshot, events)
+    replayed = journal.replay(store.game_journal(game_id))
+    assert plain(stored) == plain(cached) == plain(replayed)
+    assert [e['seq'] for e in store.game_journal(game_id)] == list(range(1, cached['version'] + 1))
+    for upto in rng.sample(range(1, cached['version'] + 1), min(3, cached['version'])):
+        assert journal.replay(store.game_journal(game_id), upto)['version'] == upto
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from satya import engine, store
+from satya.backend import VersionConflict
+
+from test_engine import correct_guesses
+
+
+def guessing_room(game_id):
+    store.create_game_state(engine.get_initial_state(game_id, {"lang": "en"}, "u1"))
+    for i, pid in enumerate(engine.PLAYER_SLOTS):
+        store.record_events(game_id, lambda s, i=i, pid=pid: engine.join(s, f"u{i + 1}", pid, f"P{i + 1}", 10))
+    store.record_events(game_id, lambda s: engine.advance(s, 20))
+    for pid in engine.PLAYER_SLOTS:
+        store.record_events(game_id, lambda s, pid=pid: engine.submit(s, pid, ["a", "b", "c"], 30))
+    store.record_events(game_id, lambda s: engine.advance(s, 40))
+    return store.load_game_state(game_id)
+
+
+def queue_behind_lock(game_id, steps):
+    """Starts one `record_events` thread per step while the room's lock is held, so they all queue up."""
+    results = [None] * len(steps)
+
+    def call(i, step):
+        try:
+            results[i] = store.record_events(game_id, step)
+        except Exception as e:
+            results[i] = e
+    threads = [threading.Thread(target=call, args=(i, step)) for i, step in enumerate(steps)]
+    with store.room_lock(game_id):
+        for thread in threads: thread.start()
+        deadline = time.time() + 10
+        while len(store._pending.get(game_id, ())) < len(steps):
+            assert time.time() < deadline, "writers did not queue up"
+            time.sleep(0.001)
+    for thread in threads: thread.join()
+    return results
+
+
+def test_queued_writes_share_one_append(backend):
+    state = guessing_room("GC0001")
+    viewers = [f"v{i}" for i in range(20)]
+    appends = backend.io['appends']
+    results = queue_behind_lock("GC0001", [
+        lambda s, uid=uid: engine.guess(s, uid, correct_guesses(state, uid), 50) for uid in viewers])
+    assert backend.io['appends'] == appends + 1
+    final = store.load_game_state("GC0001")
+    assert set(viewers) <= set(final['guesses'])
+    assert final['version'] == state['version'] + len(viewers)
+    assert all(result['version'] == final['version'] for result in results)
+    assert [e['seq'] for e in store.game_journal("GC0001")] == list(range(1, final['version'] + 1))
+
+
+def test_a_failing_step_fails_only_its_caller(backend):
+    state = guessing_room("GC0002")
+
+    def broken(s):
+        raise RuntimeError("boom")
+    stale = state['version'] - 1
+    results = queue_behind_lock("GC0002", [
+        lambda s: engine.guess(s, "v1", {}, 50),
+        broken,
+        lambda s: engine.guess(s, "v2", {}, 50),
+    ])
+    assert isinstance(results[1], RuntimeError)
+    assert {"v1", "v2"} <= set(store.load_game_state("GC0002")['guesses'])
+    with pytest.raises(VersionConflict):
+        store.record_events("GC0002", lambda s: engine.guess(s, "v3", {}, 50), expected_version=stale)
+
+
+def test_concurrent_guesses_are_all_recorded(backend):
+    state = guessing_room("GC0003")
+    viewers = [f"v{i}" for i in range(50)]
+    threads = [threading.Thread(target=store.record_events,
+                                args=("GC0003", lambda s, uid=uid: engine.guess(s, uid, correct_guesses(state, uid), 50)))
+               for uid in viewers]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    final = store.load_game_state("GC0003")
+    assert set(viewers) <= set(final['guesses'])
+    assert final['version'] == state['version'] + len(viewers)
+
+
+def test_a_write_retries_after_another_process_appends(backend):
+    state = guessing_room("GC0004")
+    intruded = []
+
+    def guess_after_intruder(s, uid):
+        if not intruded:
+            _, events = engine.guess(s, f"other-{uid}", {}, 50)
+            backend.append_events("GC0004", events, s['version'])
+            intruded.append(events)
+        return engine.guess(s, uid, {}, 50)
+    result = store.record_events("GC0004", lambda s: guess_after_intruder(s, "v1"))
+    assert {"other-v1", "v1"} <= set(result['guesses'])
+    assert result['version'] == state['version'] + 2
+    with pytest.raises(VersionConflict):
+        intruded.clear()
+        store.record_events("GC0004", lambda s: guess_after_intruder(s, "v2"), expected_version=result['version'])
+    assert "v2" not in store.load_game_state("GC0004")['guesses']